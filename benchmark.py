@@ -0,0 +1,244 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from db_manager import DBManager
+import datagen
+import passwords
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    # Highest RSS this process has reached so far; it never goes down
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(fn, repeat, rows=None):
+    # Runs fn `repeat` times; fn may return the number of rows it handled
+    timings = []
+    handled = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+        handled += result if isinstance(result, int) else (rows or 0)
+    timings.sort()
+
+    def pct(p):
+        return round(timings[min(len(timings) - 1, int(p / 100 * len(timings)))] * 1000, 3)
+
+    total = sum(timings)
+    return {
+        "repeat": repeat,
+        "mean_ms": round(statistics.fmean(timings) * 1000, 3),
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": round(timings[-1] * 1000, 3),
+        "rows_per_sec": round(handled / total, 1) if handled and total else None,
+    }
+
+
+def bench_db(db, user_id, repeat):
+    today = date.today()
+    results = {}
+    results["load_all"] = measure(lambda: len(db.get_tasks(user_id)), repeat)
+    results["load_first_page"] = measure(
+        lambda: len(db.query_tasks(user_id, order_by="due_date", limit=200)), repeat)
+    cached = DBManager(db.path, kdf_iterations=1000)
+    results["load_first_page_cached"] = measure(
+        lambda: len(cached.query_tasks(user_id, order_by="due_date", limit=200)), repeat)
+    cached.close()
+    # the page starting 90% of the way down, by offset and by keyset seek
+    depth = len(db.get_tasks(user_id)) * 9 // 10
+    deep = db.query_tasks(user_id, order_by="priority DESC", limit=1, offset=depth)
+    results["deep_page_offset"] = measure(
+        lambda: len(db.query_tasks(user_id, order_by="priority DESC", limit=200, offset=depth)), repeat)
+    if deep:
+        results["deep_page_keyset"] = measure(
+            lambda: len(db.query_tasks(user_id, order_by="priority DESC", limit=200, after=deep[0])), repeat)
+    results["filter"] = measure(
+        lambda: len(db.query_tasks(user_id, status="Pending", priority="High",
+                                   due_from=today, due_to=date.fromordinal(today.toordinal() + 30))),
+        repeat)
+    results["search"] = measure(lambda: len(db.search_tasks(user_id, "rev", limit=50)), repeat)
+    results["search_phrase"] = measure(
+        lambda: len(db.search_tasks(user_id, '"budget draft"', limit=50)), repeat)
+    results["add_task"] = measure(lambda: db.add_task(user_id, "bench task", str(today)), repeat, rows=1)
+    task_id = db.query_tasks(user_id, limit=1)[0][0]
+    results["update_task"] = measure(
+        lambda: db.update_task(task_id, new_task="bench rename"), repeat, rows=1)
+    results["bulk_insert_1k"] = measure(
+        lambda: db.add_tasks_bulk(user_id, ({"task": f"bulk {i}"} for i in range(1000))),
+        max(1, repeat // 5))
+    results["overdue_sweep"] = measure(lambda: db.mark_overdue(today), repeat)
+    return results
+
+
+def bench_ui(db, user_id, repeat):
+    # Offscreen Qt: no display needed
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    from ui_main import TaskManagerUI
+
+    results = {}
+    windows = []
+
+    def construct():
+        window = TaskManagerUI(user_id, db)
+        windows.append(window)
+        app.processEvents()
+
+    def construct_and_load():
+        # window plus the first page, which arrives from a worker thread
+        from PyQt5.QtCore import QEventLoop
+        loop = QEventLoop()
+        window = TaskManagerUI(user_id, db)
+        window.tasksLoaded.connect(loop.quit)
+        window.query_scheduler.queryFailed.connect(loop.quit)
+        windows.append(window)
+        loop.exec_()
+        return window.task_model.rowCount()
+
+    results["window_construct"] = measure(construct, max(1, repeat // 5))
+    results["window_first_page"] = measure(construct_and_load, max(1, repeat // 5))
+    window = windows[-1]
+    window.due_from.setDate(window.due_from.date().addYears(-5))
+    window.due_to.setDate(window.due_to.date().addYears(5))
+
+    def reload():
+        window.reload_tasks()
+        app.processEvents()
+        return window.task_model.rowCount()
+
+    results["reload_tasks"] = measure(reload, repeat)
+
+    def reload_and_scroll_all():
+        window.reload_tasks()
+        model = window.task_model
+        while model.canFetchMore(model.index(-1, -1)):
+            model.fetchMore(model.index(-1, -1))
+        return model.rowCount()
+
+    results["fetch_all_pages"] = measure(reload_and_scroll_all, max(1, repeat // 5))
+    for w in windows:
+        w.close()
+    return results
+
+
+def bench_kdf(repeat):
+    stored = passwords.hash_password("bench")
+    return {
+        "iterations": passwords.DEFAULT_ITERATIONS,
+        "calibrated_iterations": passwords.calibrate_iterations(),
+        "hash": measure(lambda: passwords.hash_password("bench"), repeat),
+        "verify": measure(lambda: passwords.verify_password("bench", stored), repeat),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_size(size, repeat, ui=True, seed=42):
+    # Results for one size, plus the peak RSS of the process that ran them;
+    # run() gives each size a fresh process so the peaks don't carry over
+    with tempfile.TemporaryDirectory() as tmp:
+        # Password hashing is timed separately in bench_kdf.
+        # Uncached, so the query cases time SQLite; see load_first_page_cached
+        db = DBManager(os.path.join(tmp, "tasks.db"), kdf_iterations=1000, cache_size=0)
+        start = time.perf_counter()
+        user_ids = datagen.generate(db, users=2, tasks_per_user=size, seed=seed)
+        generate_s = time.perf_counter() - start
+        results = {"generate_s": round(generate_s, 3)}
+        results.update(bench_db(db, user_ids[0], repeat))
+        if ui:
+            results.update(bench_ui(db, user_ids[0], repeat))
+        db.close()
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def run(sizes, repeat, ui=True, seed=42):
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": {},
+    }
+    report["kdf"] = bench_kdf(max(1, repeat // 5))
+    for size in sizes:
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            report["results"][str(size)] = pool.submit(bench_size, size, repeat, ui, seed).result()
+        print(f"{size} tasks/user done", file=sys.stderr)
+    return report
+
+
+def compare(report, baseline):
+    # Prints p50 changes against an earlier run
+    lines = []
+    for size, cases in report["results"].items():
+        old_cases = baseline.get("results", {}).get(size, {})
+        for name, stats in cases.items():
+            old = old_cases.get(name)
+            if not isinstance(stats, dict) or not isinstance(old, dict) or not old.get("p50_ms"):
+                continue
+            change = (stats["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+            flag = "  <-- slower" if change > 20 else ""
+            lines.append(f"{size:>7} {name:<20} {old['p50_ms']:>10.3f} -> {stats['p50_ms']:>10.3f} ms "
+                         f"({change:+.1f}%){flag}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DBManager and the task view.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="tasks per user")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-ui", action="store_true", help="skip the Qt benchmarks")
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat, ui=not args.no_ui, seed=args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(report, json.load(f)))
+
+
+if __name__ == "__main__":
+    main()
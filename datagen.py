@@ -0,0 +1,67 @@
+import argparse
+import random
+from datetime import date, timedelta
+from db_manager import DBManager
+
+VERBS = ["Write", "Review", "Call", "Email", "Plan", "Fix", "Update", "Prepare", "Book", "Check"]
+OBJECTS = [
+    "quarterly report", "budget draft", "team meeting notes", "client proposal", "invoice",
+    "dentist appointment", "project roadmap", "release checklist", "design mockups",
+    "travel itinerary", "code review", "onboarding docs", "grocery list", "tax forms",
+]
+DETAILS = ["", "", "for Monday", "before standup", "with Alex", "(urgent)", "v2", "follow-up"]
+
+PRIORITIES = ["High", "Medium", "Low"]
+PRIORITY_WEIGHTS = [2, 5, 3]
+
+
+def _task_rows(rng, count, today):
+    for _ in range(count):
+        text = f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(DETAILS)}".strip()
+        if rng.random() < 0.1:
+            due = None
+        else:
+            # most deadlines cluster around today, with a long tail either way
+            due = today + timedelta(days=int(rng.gauss(10, 30)))
+        if due is not None and due < today:
+            status = rng.choices(["Completed", "Overdue", "Pending"], [6, 3, 1])[0]
+        else:
+            status = rng.choices(["Pending", "Completed"], [8, 2])[0]
+        yield {
+            "task": text,
+            "due_date": str(due) if due else None,
+            "priority": rng.choices(PRIORITIES, PRIORITY_WEIGHTS)[0],
+            "status": status,
+        }
+
+
+def generate(db, users=3, tasks_per_user=1000, seed=42, today=None):
+    # Fills db with `users` accounts of `tasks_per_user` tasks each; returns the user ids
+    rng = random.Random(seed)
+    today = today or date.today()
+    user_ids = []
+    for n in range(users):
+        username = f"user{n:03d}"
+        db.register_user(username, "password")
+        user_id = db.login_user(username, "password")
+        db.add_tasks_bulk(user_id, _task_rows(rng, tasks_per_user, today))
+        user_ids.append(user_id)
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a task database with synthetic data.")
+    parser.add_argument("path", help="database file to create or extend")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--tasks", type=int, default=1000, help="tasks per user")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    db = DBManager(args.path)
+    user_ids = generate(db, args.users, args.tasks, args.seed)
+    db.close()
+    print(f"Created {len(user_ids)} users with {args.tasks} tasks each in {args.path}")
+
+
+if __name__ == "__main__":
+    main()
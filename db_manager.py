@@ -1,112 +1,809 @@
+import logging
 import sqlite3
-import hashlib
-from datetime import datetime
+import string
+import re
+import threading
+import time
+import unicodedata
+import weakref
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from functools import wraps
+import migrations
+import passwords
+from maintenance import DatabaseMaintenance
+from task_cache import TaskCache
+
+logger = logging.getLogger("task_manager.db")
+
+_NO_SPAN = nullcontext()
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+# Task.urgency() classes
+OVERDUE, DUE_SOON = 1, 2
+DUE_SOON_DAYS = 2
+
+# tasks.priority_rank (see migrations._priority_rank_column)
+PRIORITY_RANKS = {"High": 1, "Medium": 2, "Low": 3}
+
+
+def epoch_day(value):
+    # date or "YYYY-MM-DD" -> days since 1970-01-01, the form tasks.due_day stores
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.toordinal() - _EPOCH
+
+
+def from_epoch_day(day):
+    return date.fromordinal(day + _EPOCH)
+
+
+class _ReaderSlot:
+    # Holds a thread's read connection in threading.local; when the thread's
+    # locals go away (thread exit, or the end of each job on a Qt pool
+    # thread) a finalizer hands the connection back
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+def _release_reader(lock, readers, idle, max_idle, conn):
+    with lock:
+        if conn not in readers:
+            return  # DBManager.close() got there first
+        if len(idle) < max_idle:
+            idle.append(conn)
+            return
+        readers.remove(conn)
+    conn.close()
+
+
+def _read_through(method):
+    # Serves method(self, user_id, ...) from self.cache; writes invalidate per user
+    @wraps(method)
+    def wrapper(self, user_id, *args, **kwargs):
+        key = (method.__name__, user_id, args, tuple(sorted(kwargs.items())))
+        rows = self.cache.get(key)
+        if rows is None:
+            generation = self.cache.generation(user_id)
+            rows = method(self, user_id, *args, **kwargs)
+            self.cache.put(key, user_id, rows, generation)
+        return rows
+    return wrapper
+
+
+class Task(namedtuple("Task", "id task status due_date priority due_day priority_rank")):
+    # One tasks row. due_day is due_date as an epoch day (None when unset or unparseable);
+    # priority_rank is PRIORITY_RANKS[priority] (None for unknown priorities).
+    __slots__ = ()
+
+    def urgency(self, today):
+        # today as an epoch day; OVERDUE, DUE_SOON or None
+        if self.due_day is None:
+            return None
+        if self.due_day < today and self.status in ("Pending", "Overdue"):
+            return OVERDUE
+        if 0 <= self.due_day - today <= DUE_SOON_DAYS:
+            return DUE_SOON
+        return None
 
 class DBManager:
-    def __init__(self):
-        self.conn = sqlite3.connect("tasks.db")
-        self.cursor = self.conn.cursor()
-        self._enable_foreign_keys()
+    TASK_COLUMNS = "id, task, status, due_date, priority, due_day, priority_rank"
+    SORTABLE_COLUMNS = ("id", "task", "status", "due_date", "priority")
+    # sort on the integer forms; each has a (user_id, column) index
+    SORT_KEYS = {"id": "id", "task": "task", "status": "status",
+                 "due_date": "due_day", "priority": "priority_rank"}
+
+    # Stored columns moved between tasks and tasks_archive (completed_day is
+    # dropped on restore so the task counts as completed today)
+    ARCHIVE_COLUMNS = "id, user_id, task, status, due_date, priority"
+    ARCHIVE_AFTER_DAYS = 30  # archive_completed() default
+    ARCHIVE_BATCH = 1000  # rows moved per transaction
+
+    IDLE_READERS = 4  # released read connections kept open for the next thread
+
+    STATS_TTL = 60  # seconds get_user_stats() may serve a cached result
+    CHANGE_BATCH = 500  # poll_changes() reports more external changes than this as a reset
+
+    # Applied to every connection; override per instance with DBManager(path, pragmas={...})
+    DEFAULT_PRAGMAS = {
+        "synchronous": "NORMAL",  # safe with WAL, one fsync per checkpoint instead of per commit
+        "cache_size": -16000,  # KiB
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # ms
+    }
+
+    def __init__(self, path="tasks.db", pragmas=None, instrumentation=None, kdf_iterations=None,
+                 cache_size=128):
+        self.path = path
+        self.pragmas = {**self.DEFAULT_PRAGMAS, **(pragmas or {})}
+        self.instrumentation = instrumentation  # see instrumentation.Instrumentation
+        # PBKDF2 cost; see passwords.calibrate_iterations(). Slow on purpose:
+        # call register_user/login_user off the GUI thread.
+        self.kdf_iterations = kdf_iterations or passwords.DEFAULT_ITERATIONS
+        self._listeners = []
+        self.fts_enabled = False
+        self._stats_cache = None  # (expires_at, stats)
+        # get_tasks/query_tasks/search_tasks results; cache_size=0 disables
+        self.cache = TaskCache(cache_size)
+        self.maintenance = DatabaseMaintenance(self)
+
+        # One writer shared by all threads (serialized by _write_lock),
+        # plus one read connection per thread, taken from a small idle list
+        # or opened lazily, and returned when the thread is done with it.
+        self._write_lock = threading.RLock()
+        self._tx_depth = 0
+        self._tx_thread = None
+        self._pending = []  # notifications held back until the transaction commits
+        # task_changes bookkeeping for poll_changes()
+        self._own_changes = []  # (first, last) journal seqs committed by this instance
+        self._own_lock = threading.Lock()
+        self._seen_seq = 0
+        self._data_version = None
+        self._local = threading.local()
+        self._readers = []  # every open read connection, for close()
+        self._idle_readers = []
+        self._readers_lock = threading.Lock()
+        self._migration_lock = threading.Lock()
+        self.conn = self._connect()
+        self.conn.execute("PRAGMA journal_mode = WAL")
         self._ensure_schema()
 
-    def _enable_foreign_keys(self):
-        self.cursor.execute("PRAGMA foreign_keys = ON;")
+    # Connections
+    def _connect(self, read_only=False):
+        conn = sqlite3.connect(
+            self.path, timeout=self.pragmas["busy_timeout"] / 1000,
+            isolation_level=None, check_same_thread=False
+        )
+        for name, value in self.pragmas.items():
+            if not re.fullmatch(r"-?\w+", str(value)):
+                raise ValueError(f"Invalid value for PRAGMA {name}: {value!r}")
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        if self.instrumentation is not None:
+            return self.instrumentation.wrap(conn)
+        return conn
 
-    def _ensure_schema(self):
-        # Users table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                last_login TIMESTAMP
-            )
-        ''')
-
-        # Tasks table base (if not exists)
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                task TEXT NOT NULL,
-                status TEXT DEFAULT "Pending",
-                FOREIGN KEY(user_id) REFERENCES users(id)
-            )
-        ''')
+    def span(self, name):
+        # Times a hot path when instrumentation is on; a shared no-op otherwise
+        if self.instrumentation is None:
+            return _NO_SPAN
+        return self.instrumentation.span(name)
 
-        # Inspect existing columns in tasks
-        self.cursor.execute("PRAGMA table_info(tasks)")
-        existing = {row[1] for row in self.cursor.fetchall()}  # column names
+    def reader(self):
+        # The calling thread's read connection
+        slot = getattr(self._local, "reader", None)
+        if slot is None:
+            with self._readers_lock:
+                conn = self._idle_readers.pop() if self._idle_readers else None
+            if conn is None:
+                conn = self._connect(read_only=True)
+                with self._readers_lock:
+                    self._readers.append(conn)
+            slot = self._local.reader = _ReaderSlot(conn)
+            weakref.finalize(slot, _release_reader, self._readers_lock, self._readers,
+                             self._idle_readers, self.IDLE_READERS, conn)
+        return slot.conn
 
-        # Add missing columns if needed
-        if "due_date" not in existing:
-            self.cursor.execute("ALTER TABLE tasks ADD COLUMN due_date TEXT")
-        if "priority" not in existing:
-            self.cursor.execute("ALTER TABLE tasks ADD COLUMN priority TEXT DEFAULT 'Medium'")
+    def _read(self, sql, params=()):
+        return self.reader().execute(sql, params)
 
-        # Commit after possible alterations
-        self.conn.commit()
+    @contextmanager
+    def _write(self):
+        # Writes are serialized through the single writer connection.
+        # Nested calls join the outer transaction.
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            if self._tx_depth:
+                self._tx_depth += 1
+                try:
+                    yield cursor
+                finally:
+                    self._tx_depth -= 1
+                return
+            cursor.execute("BEGIN IMMEDIATE")
+            self._tx_depth, self._tx_thread = 1, threading.get_ident()
+            try:
+                first = self._journal_seq(cursor)
+                yield cursor
+                last = self._journal_seq(cursor)
+                cursor.execute("COMMIT")
+                if last > first:
+                    with self._own_lock:
+                        self._own_changes.append((first + 1, last))
+            except BaseException:
+                if self.conn.in_transaction:
+                    cursor.execute("ROLLBACK")
+                self._pending.clear()
+                raise
+            finally:
+                self._tx_depth, self._tx_thread = 0, None
+            pending, self._pending = self._pending, []
+        for event, user_id, row in pending:
+            self._dispatch(event, user_id, row)
 
-    # User management
-    def _hash(self, password):
-        return hashlib.sha256(password.encode()).hexdigest()
+    @contextmanager
+    def writer(self):
+        # The writer connection with no transaction open, for PRAGMAs and
+        # statements like VACUUM that cannot run inside one
+        with self._write_lock:
+            if self._tx_depth:
+                raise RuntimeError("writer() used inside a transaction")
+            yield self.conn
+
+    @contextmanager
+    def transaction(self):
+        # Group several mutators into one commit:
+        #     with db.transaction():
+        #         db.add_task(...); db.update_task(...)
+        # Subscribers are notified only once the commit succeeds.
+        with self._write():
+            yield self
+
+    def _ensure_schema(self):
+        # Quick schema changes only; index builds, row backfills and the like
+        # wait for finish_migrations().
+        # One query in the common case: schema already current
+        version, has_fts, has_pending = self.conn.execute(
+            "SELECT (SELECT user_version FROM pragma_user_version), "
+            "EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'), "
+            "EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'schema_pending')"
+        ).fetchone()
+        if version < migrations.LATEST:
+            with self._write_lock:
+                migrations.migrate(self.conn, defer=True)
+            has_fts = self._read("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone()
+            has_pending = True
+        pending = migrations.pending(self.conn) if has_pending else []
+        self.migrations_pending = bool(pending)
+        # search uses LIKE until existing rows are in the full-text index
+        self.fts_enabled = bool(has_fts) and 1 not in pending
+        self._seen_seq = self._journal_seq(self.conn)
 
+    def finish_migrations(self, progress=None):
+        # Does the work the schema upgrade deferred (index builds, row
+        # backfills, VACUUM) and returns the versions finished. Slow on large
+        # databases: call it off the GUI thread. It writes on a connection of
+        # its own, in short transactions, so the app keeps working meanwhile;
+        # rewritten rows reach listeners through poll_changes() like any
+        # other connection's changes.
+        if not self.migrations_pending or not self._migration_lock.acquire(blocking=False):
+            return []
+        try:
+            conn = self._connect()
+            try:
+                finished = migrations.run_pending(conn, progress=progress)
+                self.fts_enabled = bool(conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'"
+                ).fetchone())
+            finally:
+                conn.close()
+            self.migrations_pending = False
+        finally:
+            self._migration_lock.release()
+        if finished:
+            logger.info("finished deferred schema work for versions %s", finished)
+        if 1 in finished:
+            self._notify_reset()  # keyword results change from LIKE to full-text matches
+        return finished
+
+    # User management
     def register_user(self, username, password):
-        hashed = self._hash(password)
+        if self._read("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone():
+            return False  # skip the expensive hash
+        hashed = passwords.hash_password(password, self.kdf_iterations)
         try:
-            self.cursor.execute(
-                "INSERT INTO users (username, password) VALUES (?, ?)",
-                (username, hashed)
-            )
-            self.conn.commit()
+            with self._write() as cursor:
+                cursor.execute(
+                    "INSERT INTO users (username, password) VALUES (?, ?)",
+                    (username, hashed)
+                )
+            self._stats_cache = None
             return True
         except sqlite3.IntegrityError:
             return False  # already exists
 
     def login_user(self, username, password):
-        hashed = self._hash(password)
-        self.cursor.execute(
-            "SELECT id FROM users WHERE username = ? AND password = ?",
-            (username, hashed)
-        )
-        row = self.cursor.fetchone()
-        if row:
-            user_id = row[0]
-            now = datetime.now()
-            self.cursor.execute("UPDATE users SET last_login = ? WHERE id = ?", (now, user_id))
-            self.conn.commit()
-            return user_id
-        return None
+        # Returns the user id, or None. Legacy SHA-256 and under-cost hashes
+        # are upgraded on the first successful login.
+        row = self._read("SELECT id, password FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            passwords.burn(self.kdf_iterations)
+            return None
+        user_id, stored = row
+        matches, needs_rehash = passwords.verify_password(password, stored, self.kdf_iterations)
+        if not matches:
+            return None
+        # hash before taking the write lock
+        rehashed = passwords.hash_password(password, self.kdf_iterations) if needs_rehash else None
+        now = datetime.now().isoformat(" ", timespec="seconds")
+        with self._write() as cursor:
+            if rehashed:
+                cursor.execute("UPDATE users SET password = ? WHERE id = ?", (rehashed, user_id))
+            cursor.execute("UPDATE users SET last_login = ? WHERE id = ?", (now, user_id))
+        self._stats_cache = None
+        return user_id
+
+    def get_user_id(self, username):
+        row = self._read("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+        return row and row[0]
 
     def count_registered_users(self):
-        self.cursor.execute("SELECT COUNT(*) FROM users")
-        return self.cursor.fetchone()[0]
+        row = self._read("SELECT value FROM user_stats WHERE key = 'registered'").fetchone()
+        return row[0] if row else 0
 
     def count_logged_in_users_today(self):
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        self.cursor.execute("SELECT COUNT(*) FROM users WHERE last_login >= ?", (today_start,))
-        return self.cursor.fetchone()[0]
+        row = self._read("SELECT users FROM login_days WHERE day = ?", (str(date.today()),)).fetchone()
+        return row[0] if row else 0
+
+    def get_user_stats(self, max_age=None):
+        # Cached for STATS_TTL seconds; register/login on this instance invalidate it
+        cached = self._stats_cache
+        now = time.monotonic()
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        stats = {
+            "registered": self.count_registered_users(),
+            "logged_in_today": self.count_logged_in_users_today(),
+        }
+        ttl = self.STATS_TTL if max_age is None else max_age
+        self._stats_cache = (now + ttl, stats)
+        return stats
+
+    def invalidate_user_stats(self):
+        self._stats_cache = None
+
+    # Change notification
+    def subscribe(self, callback):
+        # callback(event, user_id, row) with event in "added", "updated", "deleted",
+        # or "reset" (row None) after bulk changes
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        self._listeners.remove(callback)
+
+    def _notify(self, event, returned):
+        if returned is None:
+            return
+        self._queue_or_dispatch(event, returned[0], Task._make(returned[1:]))
+
+    def _notify_reset(self, user_id=None):
+        # Too many rows changed to describe; listeners should re-query (user_id None = everyone)
+        self._queue_or_dispatch("reset", user_id, None)
+
+    def _queue_or_dispatch(self, event, user_id, row):
+        if self._tx_depth and self._tx_thread == threading.get_ident():
+            self._pending.append((event, user_id, row))
+        else:
+            self._dispatch(event, user_id, row)
+
+    def _dispatch(self, event, user_id, row):
+        # runs after the commit, so listeners that re-query see fresh rows
+        if user_id is None:
+            self.cache.clear()
+        else:
+            self.cache.invalidate_user(user_id)
+        for callback in list(self._listeners):
+            callback(event, user_id, row)
+
+    # Changes made by other processes
+    @staticmethod
+    def _journal_seq(conn):
+        # Last seq handed out in task_changes (0 before the first change)
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'task_changes'").fetchone()
+        return row[0] if row else 0
+
+    def poll_changes(self):
+        # Dispatches task changes other connections (other app instances on
+        # the same file) committed since the last call, as if they were made
+        # here. Costs one PRAGMA when nothing changed; call from a single
+        # thread, e.g. a timer. Returns the number of changes dispatched.
+        conn = self.reader()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return 0
+        self._data_version = version
+        latest = self._journal_seq(conn)
+        if latest <= self._seen_seq:
+            return 0
+
+        # Seek over the journal between this instance's own commits, which
+        # were dispatched when they happened
+        with self._own_lock:
+            own = [(first, last) for first, last in self._own_changes if last > self._seen_seq]
+            self._own_changes = own
+        changes = []
+        seen = after = self._seen_seq
+        for first, last in own + [(latest + 1, latest)]:
+            if first > after + 1 and len(changes) <= self.CHANGE_BATCH:
+                changes += conn.execute(
+                    "SELECT seq, task_id, user_id, op FROM task_changes "
+                    "WHERE seq > ? AND seq < ? ORDER BY seq LIMIT ?",
+                    (after, min(first, latest + 1), self.CHANGE_BATCH + 1 - len(changes))
+                ).fetchall()
+            after = max(after, last)
+        self._seen_seq = latest
+        if not changes:
+            return 0
+        # Re-query everything if the journal was trimmed past us or there are
+        # too many changes to replay one by one
+        oldest = conn.execute("SELECT min(seq) FROM task_changes").fetchone()[0]
+        if oldest > seen + 1 or len(changes) > self.CHANGE_BATCH:
+            self._dispatch("reset", None, None)
+            return len(changes)
+
+        ops = {}  # task_id -> (user_id, first op, last op), in journal order
+        for _, task_id, user_id, op in changes:
+            first_op = ops[task_id][1] if task_id in ops else op
+            ops[task_id] = (user_id, first_op, op)
+        placeholders = ", ".join("?" * len(ops))
+        current = {
+            row[1]: row for row in conn.execute(
+                f"SELECT user_id, {self.TASK_COLUMNS} FROM tasks WHERE id IN ({placeholders}) "
+                f"UNION ALL SELECT user_id, {self.TASK_COLUMNS} FROM tasks_archive "
+                f"WHERE id IN ({placeholders})",
+                list(ops) * 2
+            )
+        }
+        for task_id, (user_id, first_op, _) in ops.items():
+            row = current.get(task_id)
+            if row is None:
+                self._dispatch("deleted", user_id, Task._make((task_id,) + (None,) * 6))
+            else:
+                self._dispatch("added" if first_op == "I" else "updated", row[0], Task._make(row[1:]))
+        return len(ops)
+
+    def _write_returning(self, sql, params):
+        # RETURNING rows must be read before the commit
+        with self._write() as cursor:
+            cursor.execute(f"{sql} RETURNING user_id, {self.TASK_COLUMNS}", params)
+            returned = cursor.fetchall()
+        return returned[0] if returned else None
 
     # Task management
     def add_task(self, user_id, task, due_date=None, priority="Medium"):
-        self.cursor.execute(
+        returned = self._write_returning(
             "INSERT INTO tasks (user_id, task, due_date, priority) VALUES (?, ?, ?, ?)",
             (user_id, task, due_date, priority)
         )
-        self.conn.commit()
+        self._notify("added", returned)
+        return Task._make(returned[1:])
 
+    def add_tasks_bulk(self, user_id, rows):
+        # rows: iterable of dicts with "task" and optional "due_date", "priority", "status"
+        params = (
+            (user_id, row["task"], row.get("due_date") or None,
+             row.get("priority") or "Medium", row.get("status") or "Pending")
+            for row in rows
+        )
+        with self._write() as cursor:
+            cursor.executemany(
+                "INSERT INTO tasks (user_id, task, due_date, priority, status) VALUES (?, ?, ?, ?, ?)",
+                params
+            )
+            count = cursor.rowcount
+        if count:
+            self._notify_reset(user_id)
+        return count
+
+    def update_tasks_bulk(self, rows):
+        # rows: iterable of dicts with "id" plus any of "task", "due_date", "priority", "status";
+        # missing or None fields are left unchanged
+        fields = ("task", "due_date", "priority", "status")
+        params = [{"id": row["id"], **{f: row.get(f) for f in fields}} for row in rows]
+        users = set()
+        with self._write() as cursor:
+            ids = [row["id"] for row in params]
+            for start in range(0, len(ids), self.ARCHIVE_BATCH):
+                chunk = ids[start:start + self.ARCHIVE_BATCH]
+                self._unarchive(cursor, chunk)
+                marks = ", ".join("?" * len(chunk))
+                cursor.execute(f"SELECT DISTINCT user_id FROM tasks WHERE id IN ({marks})", chunk)
+                users.update(row[0] for row in cursor.fetchall())
+            cursor.executemany(
+                "UPDATE tasks SET "
+                + ", ".join(f"{f} = COALESCE(:{f}, {f})" for f in fields)
+                + " WHERE id = :id",
+                params
+            )
+            count = cursor.rowcount
+            if count:
+                for user_id in users:  # only the owners of the updated rows re-query
+                    self._notify_reset(user_id)
+        return count
+
+    def get_pending_due(self, user_id, since, until=None):
+        # Pending tasks due from `since` through `until` (dates or epoch days;
+        # until None = no limit), soonest first
+        sql = f"SELECT {self.TASK_COLUMNS} FROM tasks WHERE user_id = ? AND status = 'Pending' AND due_day >= ?"
+        params = [user_id, since if isinstance(since, int) else epoch_day(since)]
+        if until is not None:
+            sql += " AND due_day <= ?"
+            params.append(until if isinstance(until, int) else epoch_day(until))
+        rows = self._read(sql + " ORDER BY due_day, id", tuple(params)).fetchall()
+        return list(map(Task._make, rows))
+
+    def iter_tasks(self, user_id, chunk_size=1000):
+        # Streams a user's tasks, archived ones included, without materializing them all
+        cursor = self._read(
+            self._select_sql(["tasks.user_id = ?"], "id", self._sources()), (user_id, user_id)
+        )
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                return
+            yield from map(Task._make, chunk)
+
+    def get_task(self, task_id):
+        row = self._read(
+            self._select_sql(["tasks.id = ?"], None, self._sources()), (task_id, task_id)
+        ).fetchone()
+        return row and Task._make(row)
+
+    @_read_through
     def get_tasks(self, user_id):
-        self.cursor.execute(
-            "SELECT id, task, status, due_date, priority FROM tasks WHERE user_id = ?",
-            (user_id,)
+        return self._task_page(["tasks.user_id = ?"], [user_id], "id", sources=self._sources())
+
+    def count_tasks(self, user_id):
+        # {status: count}, archived tasks included
+        rows = self._read(
+            "SELECT status, count(*) FROM (SELECT status FROM tasks WHERE user_id = ? "
+            "UNION ALL SELECT status FROM tasks_archive WHERE user_id = ?) GROUP BY status",
+            (user_id, user_id)
+        ).fetchall()
+        return dict(rows)
+
+    # Archive
+    @staticmethod
+    def _sources(status=None):
+        # Tables a query with this status filter has to read; every archived task is Completed
+        return ("tasks", "tasks_archive") if status in (None, "", "Completed") else ("tasks",)
+
+    def archive_completed(self, older_than_days=None, today=None, batch_size=None, pause=0.02):
+        # Moves tasks completed more than older_than_days ago into tasks_archive,
+        # batch_size per transaction with a pause between so other writers get
+        # the lock. Queries read the archive too, so nothing visible changes and
+        # listeners are not notified. Returns the number of tasks moved.
+        days = self.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        batch_size = batch_size or self.ARCHIVE_BATCH
+        cutoff = epoch_day(today or date.today()) - days
+        moved = 0
+        while True:
+            with self._write() as cursor:
+                ids = [row[0] for row in cursor.execute(
+                    "SELECT id FROM tasks WHERE status = 'Completed' AND completed_day < ? LIMIT ?",
+                    (cutoff, batch_size)
+                )]
+                if ids:
+                    marks = ", ".join("?" * len(ids))
+                    cursor.execute(
+                        f"INSERT INTO tasks_archive ({self.ARCHIVE_COLUMNS}, completed_day) "
+                        f"SELECT {self.ARCHIVE_COLUMNS}, completed_day FROM tasks WHERE id IN ({marks})",
+                        ids
+                    )
+                    cursor.execute(f"DELETE FROM tasks WHERE id IN ({marks})", ids)
+            moved += len(ids)
+            if len(ids) < batch_size:
+                return moved
+            time.sleep(pause)
+
+    def restore_tasks(self, task_ids):
+        # Moves archived tasks back into tasks; returns how many were archived
+        task_ids = list(task_ids)
+        restored = 0
+        with self._write() as cursor:
+            for start in range(0, len(task_ids), self.ARCHIVE_BATCH):
+                restored += self._unarchive(cursor, task_ids[start:start + self.ARCHIVE_BATCH])
+        return restored
+
+    def _unarchive(self, cursor, task_ids):
+        # Mutators call this first, so editing an archived task restores it
+        marks = ", ".join("?" * len(task_ids))
+        cursor.execute(
+            f"INSERT INTO tasks ({self.ARCHIVE_COLUMNS}) "
+            f"SELECT {self.ARCHIVE_COLUMNS} FROM tasks_archive WHERE id IN ({marks})",
+            task_ids
         )
-        return self.cursor.fetchall()
+        restored = cursor.rowcount
+        if restored:
+            cursor.execute(f"DELETE FROM tasks_archive WHERE id IN ({marks})", task_ids)
+        return restored
 
-    def update_task_status(self, task_id, new_status):
-        self.cursor.execute(
-            "UPDATE tasks SET status = ? WHERE id = ?", (new_status, task_id)
+    # Search
+    # Tokens as the FTS5 unicode61 tokenizer splits them: runs of letters and
+    # digits, so "_" separates words like any other punctuation
+    _TOKEN_RE = re.compile(r"[^\W_]+")
+    _TERM_RE = re.compile(r'"([^"]*)"|([^\W_]+)')
+    _ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+    @staticmethod
+    def _fold(text):
+        # lower-case and strip accents like the FTS5 unicode61 tokenizer
+        decomposed = unicodedata.normalize("NFKD", text.lower())
+        return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+    @classmethod
+    def _search_terms(cls, text):
+        # [(tokens, is_phrase)]: bare words match as prefixes, "quoted text" as
+        # phrases; phrases without a token ("", "--") are dropped
+        terms = []
+        for phrase, word in cls._TERM_RE.findall(cls._fold(text)):
+            tokens = cls._TOKEN_RE.findall(phrase) if not word else [word]
+            if tokens:
+                terms.append((tokens, bool(phrase)))
+        return terms
+
+    @classmethod
+    def _fts_query(cls, text):
+        parts = []
+        for tokens, is_phrase in cls._search_terms(text):
+            quoted = f'"{" ".join(tokens)}"'
+            parts.append(quoted if is_phrase else quoted + "*")
+        return " ".join(parts)
+
+    def matches_keyword(self, keyword, text):
+        # Python twin of the keyword filter in query_tasks, for single-row checks
+        if not keyword:
+            return True
+        terms = self._search_terms(keyword) if self.fts_enabled else []
+        if not terms:
+            # LIKE, which only folds ASCII case
+            return keyword.translate(self._ASCII_LOWER) in text.translate(self._ASCII_LOWER)
+        tokens = self._TOKEN_RE.findall(self._fold(text))
+        for needle, is_phrase in terms:
+            if is_phrase:
+                n = len(needle)
+                if not any(tokens[i:i + n] == needle for i in range(len(tokens) - n + 1)):
+                    return False
+            elif not any(token.startswith(needle[0]) for token in tokens):
+                return False
+        return True
+
+    def _task_filters(self, user_id, status=None, priority=None, due_from=None, due_to=None,
+                      due_index=True):
+        # Tasks without a due date always pass the due range filter.
+        # due_index=False keeps the planner on the sort index (unary + hides due_day's).
+        day = "tasks.due_day" if due_index else "+tasks.due_day"
+        where = ["tasks.user_id = ?"]
+        params = [user_id]
+        if status:
+            where.append("tasks.status = ?")
+            params.append(status)
+        if priority in PRIORITY_RANKS:
+            where.append("tasks.priority_rank = ?")
+            params.append(PRIORITY_RANKS[priority])
+        elif priority:
+            where.append("tasks.priority = ?")
+            params.append(priority)
+        if due_from is not None or due_to is not None:
+            bounds = []
+            if due_from is not None:
+                bounds.append(f"{day} >= ?")
+                params.append(epoch_day(due_from))
+            if due_to is not None:
+                bounds.append(f"{day} <= ?")
+                params.append(epoch_day(due_to))
+            where.append(f"({day} IS NULL OR ({' AND '.join(bounds)}))")
+        return where, params
+
+    def sort_key(self, order_by):
+        # "due_date DESC" -> ("due_day", True); None -> ("id", False)
+        if order_by is None:
+            return "id", False
+        column, _, direction = order_by.partition(" ")
+        if column not in self.SORTABLE_COLUMNS:
+            raise ValueError(f"Cannot order tasks by {column!r}")
+        return self.SORT_KEYS[column], direction.strip().upper() == "DESC"
+
+    @_read_through
+    def query_tasks(self, user_id, keyword=None, status=None, priority=None,
+                    due_from=None, due_to=None, order_by=None, limit=None, offset=None, after=None):
+        # Ordered by order_by ("<column> [ASC|DESC]"), then id in the same direction.
+        # Pass the last Task of the previous page as `after` to seek straight to the
+        # next one through the sort index; its cost does not grow with page depth
+        # the way `offset` does.
+        key, descending = self.sort_key(order_by)
+        where, params = self._task_filters(user_id, status, priority, due_from, due_to,
+                                           due_index=key == "due_day")
+        if keyword:
+            fts_query = self._fts_query(keyword) if self.fts_enabled else ""
+            if fts_query:
+                # {table} is filled in per source by _select_sql
+                where.append("tasks.id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)")
+                params.append(fts_query)
+            else:
+                escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                where.append("tasks.task LIKE ? ESCAPE '\\'")
+                params.append(f"%{escaped}%")
+
+        sources = self._sources(status)
+        direction = "DESC" if descending else "ASC"
+        order = "id" if key == "id" else f"{key} {direction}, id"
+        if after is None:
+            return self._task_page(where, params, f"{order} {direction}", limit, offset, sources)
+
+        # NULL keys sort first ascending and last descending. Seek within the
+        # segment `after` is in, then continue into the other one if needed.
+        cmp = "<" if descending else ">"
+        value = after[Task._fields.index(key)]
+        if key == "id":
+            segments = [(f"tasks.id {cmp} ?", [after.id], order)]
+        elif value is None:
+            segments = [(f"tasks.{key} IS NULL AND tasks.id {cmp} ?", [after.id], "id")]
+            if not descending:
+                segments.append((f"tasks.{key} IS NOT NULL", [], order))
+        else:
+            segments = [(f"(tasks.{key}, tasks.id) {cmp} (?, ?)", [value, after.id], order)]
+            if descending:
+                segments.append((f"tasks.{key} IS NULL", [], "id"))
+        rows = []
+        for condition, seek_params, segment_order in segments:
+            remaining = None if limit is None else int(limit) - len(rows)
+            if remaining == 0:
+                break
+            rows.extend(self._task_page(
+                where + [condition], params + seek_params, f"{segment_order} {direction}", remaining,
+                sources=sources
+            ))
+        return rows
+
+    def _select_sql(self, where, order, sources=("tasks",), columns=None, source_sql="{table} AS tasks"):
+        # One SELECT per source table, each aliased as tasks, combined with
+        # UNION ALL. SQLite merges the arms in `order`, each read through its
+        # own sort index, so LIMIT still stops early. Callers repeat the
+        # parameters once per source.
+        condition = " AND ".join(where)
+        sql = " UNION ALL ".join(
+            f"SELECT {(columns or self.TASK_COLUMNS).format(table=table)} FROM {source_sql.format(table=table)} "
+            f"WHERE {condition.format(table=table)}"
+            for table in sources
+        )
+        return sql + f" ORDER BY {order}" if order else sql
+
+    def _task_page(self, where, params, order, limit=None, offset=None, sources=("tasks",)):
+        sql = self._select_sql(where, order, sources)
+        params = list(params) * len(sources)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+            if offset:
+                sql += " OFFSET ?"
+                params.append(int(offset))
+        return list(map(Task._make, self._read(sql, tuple(params)).fetchall()))
+
+    @_read_through
+    def search_tasks(self, user_id, query, limit=50, status=None, priority=None,
+                     due_from=None, due_to=None):
+        # Ranked full-text search: words match as prefixes, "quoted text" as a phrase
+        if not self.fts_enabled or not self._fts_query(query):
+            return self.query_tasks(user_id, keyword=query, status=status, priority=priority,
+                                    due_from=due_from, due_to=due_to, limit=limit)
+        where, params = self._task_filters(user_id, status, priority, due_from, due_to)
+        columns = ", ".join(f"tasks.{c.strip()}" for c in self.TASK_COLUMNS.split(","))
+        sources = self._sources(status)
+        sql = self._select_sql(
+            ["{table}_fts MATCH ?"] + where, "score, id", sources,
+            columns=f"{columns}, bm25({{table}}_fts) AS score",
+            source_sql="{table}_fts JOIN {table} AS tasks ON tasks.id = {table}_fts.rowid"
         )
-        self.conn.commit()
+        params = [self._fts_query(query), *params] * len(sources)
+        rows = self._read(sql + " LIMIT ?", (*params, int(limit))).fetchall()
+        return [Task._make(row[:-1]) for row in rows]
+
+    def update_task_status(self, task_id, new_status):
+        with self._write() as cursor:
+            self._unarchive(cursor, [task_id])
+            returned = self._write_returning(
+                "UPDATE tasks SET status = ? WHERE id = ?", (new_status, task_id)
+            )
+        self._notify("updated", returned)
+        return returned and Task._make(returned[1:])
 
     def update_task(self, task_id, new_task=None, new_due_date=None, new_priority=None):
         updates = []
@@ -121,15 +818,48 @@ class DBManager:
             updates.append("priority = ?")
             params.append(new_priority)
         if not updates:
-            return
+            return self.get_task(task_id)
         params.append(task_id)
         sql = f"UPDATE tasks SET {', '.join(updates)} WHERE id = ?"
-        self.cursor.execute(sql, tuple(params))
-        self.conn.commit()
+        with self._write() as cursor:
+            self._unarchive(cursor, [task_id])
+            returned = self._write_returning(sql, tuple(params))
+        self._notify("updated", returned)
+        return returned and Task._make(returned[1:])
+
+    def mark_overdue(self, today=None):
+        # One set-based UPDATE for every pending task due before today
+        today = epoch_day(today or date.today())
+        with self._write() as cursor:
+            cursor.execute(
+                "UPDATE tasks SET status = 'Overdue' "
+                "WHERE status = 'Pending' AND due_day < ? "
+                f"RETURNING user_id, {self.TASK_COLUMNS}",
+                (today,)
+            )
+            changed = cursor.fetchall()
+        for returned in changed:
+            self._notify("updated", returned)
+        return len(changed)
 
     def delete_task(self, task_id):
-        self.cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-        self.conn.commit()
+        with self._write() as cursor:
+            self._unarchive(cursor, [task_id])
+            returned = self._write_returning("DELETE FROM tasks WHERE id = ?", (task_id,))
+        self._notify("deleted", returned)
+        return returned and Task._make(returned[1:])
 
-    def close(self):
-        self.conn.close()
+    def close(self, optimize=True):
+        # optimize: refresh stale planner statistics first (see DatabaseMaintenance)
+        if optimize:
+            try:
+                self.maintenance.optimize()
+            except sqlite3.Error as e:
+                logger.warning("PRAGMA optimize on close failed: %s", e)
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+            self._idle_readers.clear()
+        with self._write_lock:
+            self.conn.close()
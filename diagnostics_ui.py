@@ -0,0 +1,95 @@
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+    QTableWidgetItem, QHeaderView, QFileDialog, QPlainTextEdit
+)
+
+
+class DiagnosticsDialog(QDialog):
+    # Shows the counters collected by instrumentation.Instrumentation,
+    # plus DBManager's task cache counters when given one
+    def __init__(self, instrumentation, parent=None, cache=None):
+        super().__init__(parent)
+        self.instrumentation = instrumentation
+        self.cache = cache
+        self.setWindowTitle("Diagnostics")
+        self.resize(900, 600)
+
+        self.spans_table = self._make_table(["Span", "Count", "Total ms", "Avg ms", "Max ms"])
+        self.queries_table = self._make_table(["Statement", "Count", "Total ms", "Max ms", "Rows"])
+        self.slow_text = QPlainTextEdit()
+        self.slow_text.setReadOnly(True)
+        self.cache_label = QLabel()
+
+        self.refresh_button = QPushButton("Refresh")
+        self.reset_button = QPushButton("Reset")
+        self.export_button = QPushButton("Export...")
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(self.refresh_button)
+        buttons.addWidget(self.reset_button)
+        buttons.addWidget(self.export_button)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Timing spans:"))
+        layout.addWidget(self.spans_table)
+        layout.addWidget(QLabel("SQL statements (by total time):"))
+        layout.addWidget(self.queries_table, 2)
+        layout.addWidget(QLabel(f"Slow queries (>= {instrumentation.slow_query_ms} ms):"))
+        layout.addWidget(self.slow_text)
+        if cache is not None:
+            layout.addWidget(self.cache_label)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+        self.refresh_button.clicked.connect(self.refresh)
+        self.reset_button.clicked.connect(self.reset)
+        self.export_button.clicked.connect(self.export)
+        self.refresh()
+
+    def _make_table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        return table
+
+    def _fill(self, table, rows):
+        table.setRowCount(len(rows))
+        for r, values in enumerate(rows):
+            for c, value in enumerate(values):
+                text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                table.setItem(r, c, QTableWidgetItem(text))
+
+    def refresh(self):
+        snapshot = self.instrumentation.snapshot()
+        spans = sorted(snapshot["spans"].items(), key=lambda kv: -kv[1]["total_ms"])
+        self._fill(self.spans_table, [
+            (name, s["count"], s["total_ms"], s["total_ms"] / max(s["count"], 1), s["max_ms"])
+            for name, s in spans
+        ])
+        queries = sorted(snapshot["queries"].items(), key=lambda kv: -kv[1]["total_ms"])[:100]
+        self._fill(self.queries_table, [
+            (sql, s["count"], s["total_ms"], s["max_ms"], s["rows"]) for sql, s in queries
+        ])
+        self.slow_text.setPlainText("\n\n".join(
+            f"{q['ms']} ms  {q['sql']}\n  params: {q['params']}\n  plan: {'; '.join(q['plan'])}"
+            for q in snapshot["slow_queries"]
+        ))
+        if self.cache is not None:
+            c = self.cache.stats()
+            self.cache_label.setText(
+                f"Task cache: {c['size']}/{c['maxsize']} entries, {c['hits']} hits, {c['misses']} misses "
+                f"({c['hit_rate']:.0%}), {c['evictions']} evictions, {c['invalidations']} invalidations"
+            )
+
+    def reset(self):
+        self.instrumentation.reset()
+        if self.cache is not None:
+            self.cache.reset_stats()
+        self.refresh()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export diagnostics", "diagnostics.json", "JSON (*.json)")
+        if path:
+            self.instrumentation.export(path)
@@ -0,0 +1,178 @@
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("task_manager.perf")
+
+_WHITESPACE = re.compile(r"\s+")
+_NO_PLAN = re.compile(r"^(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|PRAGMA|EXPLAIN)\b", re.IGNORECASE)
+
+
+def _normalize(sql):
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class Instrumentation:
+    # Aggregates per-statement SQL timings and named spans.
+    # Only created when profiling is switched on; DBManager talks to raw
+    # sqlite3 connections otherwise.
+
+    def __init__(self, slow_query_ms=50, explain_slow=True):
+        self.slow_query_ms = slow_query_ms
+        self.explain_slow = explain_slow
+        self._lock = threading.Lock()
+        self.queries = {}  # sql -> {"count", "total_ms", "max_ms", "rows"}
+        self.spans = {}  # name -> {"count", "total_ms", "max_ms"}
+        self.slow_queries = []  # most recent first, bounded
+        self.max_slow_queries = 50
+
+    # ===== recording =====
+    def record_query(self, sql, elapsed, rows=0, calls=1):
+        ms = elapsed * 1000
+        with self._lock:
+            stats = self.queries.get(sql)
+            if stats is None:
+                stats = self.queries[sql] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0}
+            stats["count"] += calls
+            stats["total_ms"] += ms
+            stats["rows"] += rows
+            if ms > stats["max_ms"]:
+                stats["max_ms"] = ms
+
+    def record_slow(self, sql, params, elapsed, plan):
+        entry = {"sql": sql, "params": repr(params)[:200], "ms": round(elapsed * 1000, 3), "plan": plan}
+        with self._lock:
+            self.slow_queries.insert(0, entry)
+            del self.slow_queries[self.max_slow_queries:]
+        logger.warning("slow query (%.1f ms): %s\n  plan: %s", entry["ms"], sql, "; ".join(plan))
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                stats = self.spans.get(name)
+                if stats is None:
+                    stats = self.spans[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+                stats["count"] += 1
+                stats["total_ms"] += ms
+                if ms > stats["max_ms"]:
+                    stats["max_ms"] = ms
+
+    # ===== reporting =====
+    def snapshot(self):
+        with self._lock:
+            return {
+                "queries": {sql: dict(s) for sql, s in self.queries.items()},
+                "spans": {name: dict(s) for name, s in self.spans.items()},
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def export(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self.queries.clear()
+            self.spans.clear()
+            self.slow_queries.clear()
+
+    # ===== sqlite3 wrappers =====
+    def wrap(self, conn):
+        return InstrumentedConnection(conn, self)
+
+
+class InstrumentedCursor:
+    # Times execute() plus the fetches that follow it, and counts rows
+    def __init__(self, cursor, conn, instrumentation):
+        self._cursor = cursor
+        self._conn = conn
+        self._inst = instrumentation
+        self._sql = None
+        self._params = None
+        self._elapsed = 0.0
+        self._reported_slow = False
+
+    def _track(self, elapsed, rows):
+        self._elapsed += elapsed
+        self._inst.record_query(self._sql, elapsed, rows, calls=0)
+        if not self._reported_slow and self._elapsed * 1000 >= self._inst.slow_query_ms:
+            self._reported_slow = True
+            plan = self._explain() if self._inst.explain_slow else []
+            self._inst.record_slow(self._sql, self._params, self._elapsed, plan)
+
+    def _explain(self):
+        if self._params is None or _NO_PLAN.match(self._sql):
+            return []  # executemany, or nothing to plan
+        try:
+            rows = self._conn.execute(f"EXPLAIN QUERY PLAN {self._sql}", self._params or ()).fetchall()
+        except Exception as e:  # plans are best effort
+            return [f"<no plan: {e}>"]
+        return [row[-1] for row in rows]
+
+    def execute(self, sql, params=()):
+        self._sql, self._params = _normalize(sql), params
+        self._elapsed, self._reported_slow = 0.0, False
+        self._inst.record_query(self._sql, 0.0)
+        start = time.perf_counter()
+        self._cursor.execute(sql, params)
+        self._track(time.perf_counter() - start, 0)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._sql, self._params = _normalize(sql), None
+        self._elapsed, self._reported_slow = 0.0, False
+        self._inst.record_query(self._sql, 0.0)
+        start = time.perf_counter()
+        self._cursor.executemany(sql, seq_of_params)
+        self._track(time.perf_counter() - start, max(self._cursor.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._track(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._track(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._track(time.perf_counter() - start, len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    def __init__(self, conn, instrumentation):
+        self._conn = conn
+        self._inst = instrumentation
+
+    def cursor(self):
+        return InstrumentedCursor(self._conn.cursor(), self._conn, self._inst)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
@@ -1,62 +1,43 @@
-from PyQt5.QtWidgets import (
-    QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
-)
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
 
-class LoginDialog(QDialog):
-    def __init__(self, db_manager):
-        super().__init__()
-        self.db = db_manager
-        self.setWindowTitle("Login or Register")
-        self.setFixedSize(300, 200)
-
-        layout = QVBoxLayout()
-
-        layout.addWidget(QLabel("Username:"))
-        self.username_input = QLineEdit()
-        layout.addWidget(self.username_input)
-
-        layout.addWidget(QLabel("Password:"))
-        self.password_input = QLineEdit()
-        self.password_input.setEchoMode(QLineEdit.Password)
-        layout.addWidget(self.password_input)
-
-        self.login_button = QPushButton("Login")
-        self.register_button = QPushButton("Register")
-        layout.addWidget(self.login_button)
-        layout.addWidget(self.register_button)
-
-        self.setLayout(layout)
+# Password checks use a deliberately slow KDF, so they run on a pool
+# thread and report back through signals instead of blocking the dialog.
 
-        self.login_button.clicked.connect(self.login)
-        self.register_button.clicked.connect(self.register)
 
-        self.user_id = None
+class AuthSignals(QObject):
+    loggedIn = pyqtSignal(object)  # user id, or None on bad credentials
+    registered = pyqtSignal(bool)  # False if the username is taken
+    failed = pyqtSignal(str)
 
-    def login(self):
-        username = self.username_input.text().strip()
-        password = self.password_input.text().strip()
 
-        if not username or not password:
-            QMessageBox.warning(self, "Input Error", "Please enter both username and password.")
-            return
-
-        user_id = self.db.verify_user(username, password)
-        if user_id:
-            self.user_id = user_id
-            self.accept()
-        else:
-            QMessageBox.warning(self, "Login Failed", "Incorrect username or password.")
-
-    def register(self):
-        username = self.username_input.text().strip()
-        password = self.password_input.text().strip()
-
-        if not username or not password:
-            QMessageBox.warning(self, "Input Error", "Please enter both username and password.")
-            return
-
-        success = self.db.register_user(username, password)
-        if success:
-            QMessageBox.information(self, "Registration Successful", "You can now log in.")
-        else:
-            QMessageBox.warning(self, "Registration Failed", "Username already exists.")
+class _AuthJob(QRunnable):
+    def __init__(self, db, action, username, password, signals):
+        super().__init__()
+        self.db = db
+        self.action = action
+        self.username = username
+        self.password = password
+        self.signals = signals
+
+    def run(self):
+        try:
+            if self.action == "login":
+                self.signals.loggedIn.emit(self.db.login_user(self.username, self.password))
+            else:
+                self.signals.registered.emit(self.db.register_user(self.username, self.password))
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+
+
+class Authenticator(QObject):
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.signals = AuthSignals(self)
+        self.pool = QThreadPool.globalInstance()
+
+    def login(self, username, password):
+        self.pool.start(_AuthJob(self.db, "login", username, password, self.signals))
+
+    def register(self, username, password):
+        self.pool.start(_AuthJob(self.db, "register", username, password, self.signals))
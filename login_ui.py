@@ -1,13 +1,14 @@
 from PyQt5.QtWidgets import (
     QDialog, QLabel, QLineEdit, QPushButton, QVBoxLayout, QMessageBox
 )
+from login_dialog import Authenticator
 
 class LoginDialog(QDialog):
     def __init__(self, db):
         super().__init__()
         self.db = db
         self.setWindowTitle("Login or Register")
-        self.setFixedSize(320, 220)
+        self.setFixedSize(320, 240)
 
         self.username_input = QLineEdit()
         self.password_input = QLineEdit()
@@ -15,6 +16,7 @@ class LoginDialog(QDialog):
 
         self.login_button = QPushButton("Login")
         self.register_button = QPushButton("Register")
+        self.status_label = QLabel()
 
         layout = QVBoxLayout()
         layout.addWidget(QLabel("Username:"))
@@ -23,34 +25,60 @@ class LoginDialog(QDialog):
         layout.addWidget(self.password_input)
         layout.addWidget(self.login_button)
         layout.addWidget(self.register_button)
+        layout.addWidget(self.status_label)
         self.setLayout(layout)
 
+        self.auth = Authenticator(db, self)
+        self.auth.signals.loggedIn.connect(self.on_logged_in)
+        self.auth.signals.registered.connect(self.on_registered)
+        self.auth.signals.failed.connect(self.on_failed)
+
         self.login_button.clicked.connect(self.login)
         self.register_button.clicked.connect(self.register)
 
         self.user_id = None
 
-    def login(self):
+    def _credentials(self):
         username = self.username_input.text().strip()
         password = self.password_input.text().strip()
         if not username or not password:
             QMessageBox.warning(self, "Input Error", "Please enter username and password.")
-            return
-        user_id = self.db.login_user(username, password)
+            return None
+        return username, password
+
+    def _set_busy(self, message):
+        busy = bool(message)
+        self.login_button.setEnabled(not busy)
+        self.register_button.setEnabled(not busy)
+        self.status_label.setText(message)
+
+    def login(self):
+        credentials = self._credentials()
+        if credentials:
+            self._set_busy("Checking credentials...")
+            self.auth.login(*credentials)
+
+    def register(self):
+        credentials = self._credentials()
+        if credentials:
+            self._set_busy("Creating account...")
+            self.auth.register(*credentials)
+
+    def on_logged_in(self, user_id):
+        self._set_busy("")
         if user_id:
             self.user_id = user_id
             self.accept()
         else:
             QMessageBox.warning(self, "Login Failed", "Invalid username or password.")
 
-    def register(self):
-        username = self.username_input.text().strip()
-        password = self.password_input.text().strip()
-        if not username or not password:
-            QMessageBox.warning(self, "Input Error", "Please enter username and password.")
-            return
-        success = self.db.register_user(username, password)
+    def on_registered(self, success):
+        self._set_busy("")
         if success:
             QMessageBox.information(self, "Registration Success", "User registered — you can now log in.")
         else:
             QMessageBox.warning(self, "Registration Failed", "Username already exists.")
+
+    def on_failed(self, message):
+        self._set_busy("")
+        QMessageBox.critical(self, "Error", message)
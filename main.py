@@ -1,21 +1,90 @@
+import time
+_START = time.perf_counter()
+
+import argparse
+import os
 import sys
-from PyQt5.QtWidgets import QApplication
-from db_manager import DBManager
-from login_ui import LoginDialog
-from ui_main import TaskManagerUI
+
+# Everything else is imported inside main(), in the order it is needed, so
+# the login dialog can appear before the main window's modules are loaded.
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Task Manager")
+    parser.add_argument("--db", default=os.environ.get("TASKS_DB", "tasks.db"), help="database file")
+    parser.add_argument("--instrument", action="store_true",
+                        help="record SQL and UI timings (see the Diagnostics button)")
+    parser.add_argument("--slow-query-ms", type=float, default=50,
+                        help="log queries slower than this with their query plan")
+    parser.add_argument("--perf-report", help="write collected timings to this JSON file on exit")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long each startup stage took")
+    # anything else is left for Qt
+    return parser.parse_known_args(argv[1:])
+
+class StartupProfile:
+    # Milestones in ms since the interpreter reached main.py
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.marks = []
+
+    def mark(self, label):
+        if self.enabled:
+            self.marks.append((label, (time.perf_counter() - _START) * 1000))
+
+    def report(self, stream=sys.stderr):
+        if not self.enabled:
+            return
+        print("startup profile (ms):", file=stream)
+        previous = 0.0
+        for label, at in self.marks:
+            print(f"  {at:9.1f}  (+{at - previous:8.1f})  {label}", file=stream)
+            previous = at
 
 def main():
-    app = QApplication(sys.argv)
-    db = DBManager()
+    args, qt_args = parse_args(sys.argv)
+    profile = StartupProfile(args.profile_startup)
 
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    profile.mark("Qt imported")
+    app = QApplication(sys.argv[:1] + qt_args)
+    profile.mark("QApplication created")
+
+    instrumentation = None
+    if args.instrument or args.perf_report:
+        import logging
+        from instrumentation import Instrumentation
+        logging.basicConfig(level=logging.WARNING)
+        instrumentation = Instrumentation(slow_query_ms=args.slow_query_ms)
+    from db_manager import DBManager
+    db = DBManager(args.db, instrumentation=instrumentation)
+    profile.mark("database opened")
+
+    from login_ui import LoginDialog
     login_dialog = LoginDialog(db)
-    if login_dialog.exec_() == LoginDialog.Accepted:
-        user_id = login_dialog.user_id
-        window = TaskManagerUI(user_id, db)
-        window.show()
-        sys.exit(app.exec_())
-    else:
+    QTimer.singleShot(0, lambda: profile.mark("login dialog shown"))
+    if login_dialog.exec_() != LoginDialog.Accepted:
+        profile.report()
         sys.exit()
+    profile.mark("logged in (includes typing)")
+
+    from ui_main import TaskManagerUI
+    profile.mark("main window imported")
+    window = TaskManagerUI(login_dialog.user_id, db)
+    window.show()
+    QTimer.singleShot(0, lambda: profile.mark("main window shown"))
+
+    def first_page_loaded():
+        window.tasksLoaded.disconnect(first_page_loaded)
+        profile.mark("first page of tasks loaded")
+        profile.report()
+    window.tasksLoaded.connect(first_page_loaded)
+
+    status = app.exec_()
+    db.close()  # also refreshes stale planner statistics
+    if args.perf_report:
+        instrumentation.export(args.perf_report)
+    sys.exit(status)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,135 @@
+import logging
+import sqlite3
+import time
+from collections import deque, namedtuple
+from contextlib import nullcontext
+
+logger = logging.getLogger("task_manager.maintenance")
+
+
+class MaintenanceRun(namedtuple("MaintenanceRun", "operation seconds size_before size_after detail")):
+    # One maintenance run: how long it took and the database size in bytes
+    # (page_count * page_size) before and after
+    __slots__ = ()
+
+    @property
+    def freed(self):
+        return self.size_before - self.size_after
+
+    def __str__(self):
+        change = f"{self.freed / 1024:.0f} KiB freed" if self.freed >= 0 else f"{-self.freed / 1024:.0f} KiB added"
+        text = f"{self.operation}: {self.seconds * 1000:.1f} ms, {change}"
+        return f"{text} ({self.detail})" if self.detail else text
+
+
+class DatabaseMaintenance:
+    # ANALYZE / PRAGMA optimize, incremental vacuum, integrity checks and
+    # online backups for a DBManager (its .maintenance). Writes go through
+    # the writer connection under the DBManager's write lock, so they never
+    # interleave with a transaction; checks and backups read on the calling
+    # thread's reader. Every run is logged and kept in `history`.
+    STEP_PAGES = 256  # free pages idle_step() releases at a time
+    OPTIMIZE_INTERVAL = 6 * 60 * 60  # seconds between idle_step() optimizes
+    ANALYSIS_LIMIT = 1000  # rows optimize() samples per index; 0 = all
+    HISTORY = 50
+
+    def __init__(self, db):
+        self.db = db
+        self.history = deque(maxlen=self.HISTORY)
+        self._optimized_at = time.monotonic()
+
+    @staticmethod
+    def _size(conn):
+        page_count, page_size, free = conn.execute(
+            "SELECT * FROM pragma_page_count, pragma_page_size, pragma_freelist_count"
+        ).fetchone()
+        return page_count * page_size, free
+
+    def _run(self, operation, work, conn=None):
+        # work(conn) -> detail string; measured on the writer unless conn is given
+        with self.db.writer() if conn is None else nullcontext(conn) as conn:
+            size_before, _ = self._size(conn)
+            start = time.perf_counter()
+            detail = work(conn)
+            seconds = time.perf_counter() - start
+            size_after, _ = self._size(conn)
+        run = MaintenanceRun(operation, seconds, size_before, size_after, detail)
+        self.history.append(run)
+        logger.info("%s", run)
+        return run
+
+    # ===== statistics =====
+    def optimize(self):
+        # ANALYZE only the tables whose statistics are missing or stale.
+        # 0x10002: consider every table, not just those this connection queried.
+        def work(conn):
+            conn.execute(f"PRAGMA analysis_limit = {int(self.ANALYSIS_LIMIT)}")
+            conn.execute("PRAGMA optimize(0x10002)").fetchall()
+            return ""
+        self._optimized_at = time.monotonic()
+        return self._run("optimize", work)
+
+    def analyze(self):
+        # Full statistics for every index
+        def work(conn):
+            conn.execute("PRAGMA analysis_limit = 0")
+            conn.execute("ANALYZE")
+            return ""
+        return self._run("analyze", work)
+
+    # ===== free space =====
+    def free_pages(self):
+        return self._size(self.db.reader())[1]
+
+    def incremental_vacuum(self, pages=None):
+        # Returns up to `pages` free pages (all when None) to the filesystem.
+        # Needs auto_vacuum=INCREMENTAL (migration 8); the file itself shrinks
+        # at the next WAL checkpoint.
+        def work(conn):
+            _, free = self._size(conn)
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages or 0)})").fetchall()
+            return f"{free - self._size(conn)[1]} of {free} free pages released"
+        return self._run("incremental_vacuum", work)
+
+    def vacuum(self):
+        # Rebuilds the whole file; blocks writers for as long as it takes
+        def work(conn):
+            conn.execute("VACUUM")
+            return ""
+        return self._run("vacuum", work)
+
+    def idle_step(self):
+        # A small bounded piece of work for a periodic timer: release up to
+        # STEP_PAGES free pages, or refresh statistics every OPTIMIZE_INTERVAL.
+        # Returns the run, or None if there was nothing to do.
+        if self.free_pages():
+            return self.incremental_vacuum(self.STEP_PAGES)
+        if time.monotonic() - self._optimized_at >= self.OPTIMIZE_INTERVAL:
+            return self.optimize()
+        return None
+
+    # ===== integrity and backup =====
+    def quick_check(self, max_errors=100):
+        # Returns the problems PRAGMA quick_check found ([] when healthy).
+        # Skips the index-content checks of integrity_check, so it is O(N).
+        problems = []
+
+        def work(conn):
+            rows = conn.execute(f"PRAGMA quick_check({int(max_errors)})").fetchall()
+            problems.extend(row[0] for row in rows if row[0] != "ok")
+            return f"{len(problems)} problems" if problems else "ok"
+        self._run("quick_check", work, self.db.reader())
+        return problems
+
+    def backup(self, path, pages=-1, progress=None):
+        # Consistent copy of the live database via the SQLite backup API.
+        # With WAL the copy reads one snapshot, so writers are never blocked;
+        # pages > 0 copies in steps (progress(status, remaining, total) after each).
+        def work(conn):
+            target = sqlite3.connect(path)
+            try:
+                conn.backup(target, pages=pages, progress=progress)
+            finally:
+                target.close()
+            return f"to {path}"
+        return self._run("backup", work, self.db.reader())
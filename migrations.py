@@ -0,0 +1,503 @@
+import argparse
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# Ordered schema migrations, tracked in PRAGMA user_version.
+#
+# Each step's `apply(cursor)` makes the quick schema changes (tables,
+# columns, triggers) in one IMMEDIATE transaction, together with the
+# user_version bump, and must be idempotent.
+#
+# Work whose cost grows with the data is deferred: the step is recorded in
+# schema_pending and run_pending() does it later, while other connections
+# keep reading and writing. In order, each pending step runs
+#   build       SQL statements or fn(cursor), one transaction each (indexes)
+#   backfill    fn(cursor, after_id, batch_size) rewriting rows in id order,
+#               one short transaction per batch; returns the id to resume
+#               after, or None once done
+#   standalone  fn(cursor) outside any transaction, for VACUUM
+# Progress is saved as it goes, so an interrupted run resumes where it
+# stopped. Code must cope with pending work: a missing index only costs
+# speed, and rows a backfill has not reached yet must still be readable.
+# New databases have no rows, so migrate() does their deferred work at once.
+Migration = namedtuple("Migration", "version name apply build backfill standalone", defaults=((), None, None))
+
+BATCH_SIZE = 5000
+# Idle time between batches. Without it the next BEGIN IMMEDIATE wins the
+# lock again before other connections' busy handlers wake up.
+BATCH_PAUSE = 0.02  # seconds
+
+
+# ===== steps =====
+def _base_schema(cursor):
+    # Tables, FTS and stats, on top of the unversioned schema
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            last_login TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            task TEXT NOT NULL,
+            status TEXT DEFAULT "Pending",
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    ''')
+    # very old databases predate these columns
+    cursor.execute("PRAGMA table_info(tasks)")
+    existing = {row[1] for row in cursor.fetchall()}
+    if "due_date" not in existing:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN due_date TEXT")
+    if "priority" not in existing:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN priority TEXT DEFAULT 'Medium'")
+
+    _create_fts(cursor)
+    _create_stats(cursor)
+
+
+def _create_fts(cursor):
+    # Full-text index over task text, kept in sync by triggers; existing rows
+    # are indexed by _rebuild_fts. Builds without FTS5 fall back to LIKE scans.
+    try:
+        cursor.execute("SAVEPOINT fts")
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts "
+            "USING fts5(task, content='tasks', content_rowid='id')"
+        )
+    except sqlite3.OperationalError:
+        cursor.execute("ROLLBACK TO fts")
+        return
+    finally:
+        cursor.execute("RELEASE fts")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, task) VALUES (new.id, new.task);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, task) VALUES ('delete', old.id, old.task);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF task ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, task) VALUES ('delete', old.id, old.task);
+            INSERT INTO tasks_fts(rowid, task) VALUES (new.id, new.task);
+        END
+    ''')
+
+
+def _rebuild_fts(cursor):
+    if _has_table(cursor, "tasks_fts"):
+        cursor.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+
+def _create_stats(cursor):
+    # Summary counters maintained by triggers, so stats never scan users
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'user_stats'")
+    created = cursor.fetchone() is None
+    cursor.execute("CREATE TABLE IF NOT EXISTS user_stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    # distinct users whose first login of the day was on `day`
+    cursor.execute("CREATE TABLE IF NOT EXISTS login_days (day TEXT PRIMARY KEY, users INTEGER NOT NULL)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_last_login ON users(last_login)")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_stats_ai AFTER INSERT ON users BEGIN
+            UPDATE user_stats SET value = value + 1 WHERE key = 'registered';
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_stats_ad AFTER DELETE ON users BEGIN
+            UPDATE user_stats SET value = value - 1 WHERE key = 'registered';
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_stats_login AFTER UPDATE OF last_login ON users
+        WHEN new.last_login IS NOT NULL
+            AND (old.last_login IS NULL OR date(old.last_login) IS NOT date(new.last_login))
+        BEGIN
+            INSERT INTO login_days (day, users) VALUES (date(new.last_login), 1)
+                ON CONFLICT(day) DO UPDATE SET users = users + 1;
+        END
+    ''')
+    if created:
+        cursor.execute("INSERT INTO user_stats (key, value) SELECT 'registered', COUNT(*) FROM users")
+        cursor.execute(
+            "INSERT INTO login_days (day, users) "
+            "SELECT date(last_login), COUNT(*) FROM users "
+            "WHERE date(last_login) IS NOT NULL GROUP BY date(last_login)"
+        )
+
+
+def _next_batch(cursor, table, after_id, batch_size):
+    # (last id in the batch, id to resume after or None if this is the last batch).
+    # A short batch ends the backfill: rows inserted after that were written
+    # by code that already stores the new format, so there is no tail to chase.
+    cursor.execute(
+        f"SELECT max(id), count(*) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)",
+        (after_id, batch_size)
+    )
+    last, count = cursor.fetchone()
+    return last, (last if count == batch_size else None)
+
+
+def _normalize_due_dates(cursor, after_id, batch_size):
+    # due_date is stored as YYYY-MM-DD or NULL. Blank strings become NULL and
+    # timestamps are cut to their date; values SQLite cannot parse are left alone.
+    last, resume = _next_batch(cursor, "tasks", after_id, batch_size)
+    if last is None:
+        return None
+    cursor.execute('''
+        UPDATE tasks
+        SET due_date = CASE WHEN trim(due_date) = '' THEN NULL ELSE date(due_date) END
+        WHERE id > ? AND id <= ? AND due_date IS NOT NULL
+            AND (trim(due_date) = '' OR date(due_date) <> due_date)
+    ''', (after_id, last))
+    return resume
+
+
+def _normalize_last_logins(cursor, after_id, batch_size):
+    # last_login is stored as "YYYY-MM-DD HH:MM:SS" (what login_user writes)
+    last, resume = _next_batch(cursor, "users", after_id, batch_size)
+    if last is None:
+        return None
+    cursor.execute('''
+        UPDATE users
+        SET last_login = CASE WHEN trim(last_login) = '' THEN NULL ELSE datetime(last_login) END
+        WHERE id > ? AND id <= ? AND last_login IS NOT NULL
+            AND (trim(last_login) = '' OR datetime(last_login) <> last_login)
+    ''', (after_id, last))
+    return resume
+
+
+def _due_day_column(cursor):
+    # Integer epoch-day twin of due_date, so range filters, sorting and the
+    # overdue sweep compare integers. VIRTUAL: computed on read, stored only in
+    # the indexes, and always in step with due_date.
+    cursor.execute("PRAGMA table_xinfo(tasks)")
+    if "due_day" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(
+            "ALTER TABLE tasks ADD COLUMN due_day INTEGER "
+            "GENERATED ALWAYS AS (CAST(julianday(due_date) - 2440587.5 AS INTEGER)) VIRTUAL"
+        )
+
+
+# query_tasks filters and due-date sorting, and the overdue sweep
+_DUE_DAY_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_status_day ON tasks(user_id, status, due_day)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_day ON tasks(user_id, due_day)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_status_day ON tasks(status, due_day)",
+)
+
+
+def _priority_rank_column(cursor):
+    # Numeric priority (High=1, Medium=2, Low=3) so priority sorts meaningfully,
+    # plus one (user_id, sort key) index per sortable column for keyset paging
+    cursor.execute("PRAGMA table_xinfo(tasks)")
+    if "priority_rank" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(
+            "ALTER TABLE tasks ADD COLUMN priority_rank INTEGER GENERATED ALWAYS AS "
+            "(CASE priority WHEN 'High' THEN 1 WHEN 'Medium' THEN 2 WHEN 'Low' THEN 3 END) VIRTUAL"
+        )
+
+
+_SORT_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user ON tasks(user_id)",  # ORDER BY id
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_rank ON tasks(user_id, priority_rank)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_task ON tasks(user_id, task)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_status ON tasks(user_id, status)",
+)
+
+
+def _change_journal(cursor):
+    # Append-only feed of task ids touched by any connection, for
+    # DBManager.poll_changes. AUTOINCREMENT keeps seq monotonic across
+    # deletes; the journal trims itself to roughly the last 10000 entries.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            op TEXT NOT NULL  -- 'I'nsert, 'U'pdate or 'D'elete
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_changes_ai AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_changes (task_id, user_id, op) VALUES (new.id, new.user_id, 'I');
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_changes_au AFTER UPDATE ON tasks BEGIN
+            INSERT INTO task_changes (task_id, user_id, op) VALUES (new.id, new.user_id, 'U');
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_changes_ad AFTER DELETE ON tasks BEGIN
+            INSERT INTO task_changes (task_id, user_id, op) VALUES (old.id, old.user_id, 'D');
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS task_changes_trim AFTER INSERT ON task_changes
+        WHEN new.seq % 1000 = 0 BEGIN
+            DELETE FROM task_changes WHERE seq <= new.seq - 10000;
+        END
+    ''')
+
+
+def _archive_table(cursor):
+    # Completed tasks move to tasks_archive once completed_day is old enough
+    # (DBManager.archive_completed), keeping the table the common views scan
+    # small. The archive has the same columns and generated keys as tasks.
+    cursor.execute("PRAGMA table_xinfo(tasks)")
+    if "completed_day" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN completed_day INTEGER")
+    # epoch day (local time) the task was last marked Completed, NULL otherwise
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_completed_ai AFTER INSERT ON tasks
+        WHEN new.status = 'Completed' AND new.completed_day IS NULL BEGIN
+            UPDATE tasks SET completed_day = CAST(julianday('now', 'localtime') - 2440587.5 AS INTEGER)
+            WHERE id = new.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_completed_au AFTER UPDATE OF status ON tasks
+        WHEN (new.status = 'Completed') IS NOT (old.status = 'Completed') BEGIN
+            UPDATE tasks SET completed_day = CASE WHEN new.status = 'Completed'
+                THEN CAST(julianday('now', 'localtime') - 2440587.5 AS INTEGER) END
+            WHERE id = new.id;
+        END
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tasks_archive (
+            id INTEGER PRIMARY KEY,  -- keeps the id it had in tasks
+            user_id INTEGER NOT NULL,
+            task TEXT NOT NULL,
+            status TEXT,
+            due_date TEXT,
+            priority TEXT,
+            completed_day INTEGER,
+            due_day INTEGER GENERATED ALWAYS AS (CAST(julianday(due_date) - 2440587.5 AS INTEGER)) VIRTUAL,
+            priority_rank INTEGER GENERATED ALWAYS AS
+                (CASE priority WHEN 'High' THEN 1 WHEN 'Medium' THEN 2 WHEN 'Low' THEN 3 END) VIRTUAL,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    ''')
+    # the same (user_id, sort key) indexes query_tasks pages through on tasks
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archive_user ON tasks_archive(user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archive_user_day ON tasks_archive(user_id, due_day)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archive_user_rank ON tasks_archive(user_id, priority_rank)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archive_user_task ON tasks_archive(user_id, task)")
+    # moves out of tasks are journaled as deletes there; this covers restores and deletes
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_archive_changes_ad AFTER DELETE ON tasks_archive BEGIN
+            INSERT INTO task_changes (task_id, user_id, op) VALUES (old.id, old.user_id, 'D');
+        END
+    ''')
+
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'")
+    if cursor.fetchone() is None:
+        return  # no FTS5 in this build
+    cursor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_archive_fts "
+        "USING fts5(task, content='tasks_archive', content_rowid='id')"
+    )
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_archive_fts_ai AFTER INSERT ON tasks_archive BEGIN
+            INSERT INTO tasks_archive_fts(rowid, task) VALUES (new.id, new.task);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_archive_fts_ad AFTER DELETE ON tasks_archive BEGIN
+            INSERT INTO tasks_archive_fts(tasks_archive_fts, rowid, task) VALUES ('delete', old.id, old.task);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_archive_fts_au AFTER UPDATE OF task ON tasks_archive BEGIN
+            INSERT INTO tasks_archive_fts(tasks_archive_fts, rowid, task) VALUES ('delete', old.id, old.task);
+            INSERT INTO tasks_archive_fts(rowid, task) VALUES (new.id, new.task);
+        END
+    ''')
+
+
+def _backfill_completed_days(cursor, after_id, batch_size):
+    # Completion dates were never recorded; the due date is the best guess,
+    # and today for tasks without one
+    last, resume = _next_batch(cursor, "tasks", after_id, batch_size)
+    if last is None:
+        return None
+    cursor.execute('''
+        UPDATE tasks
+        SET completed_day = COALESCE(due_day, CAST(julianday('now', 'localtime') - 2440587.5 AS INTEGER))
+        WHERE id > ? AND id <= ? AND status = 'Completed' AND completed_day IS NULL
+    ''', (after_id, last))
+    return resume
+
+
+_COMPLETED_INDEX = "CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed_day) WHERE status = 'Completed'"
+
+
+def _incremental_auto_vacuum(cursor):
+    # Lets DBManager.maintenance hand free pages back to the filesystem a few
+    # at a time (PRAGMA incremental_vacuum). Switching an existing database
+    # over takes one full VACUUM; its length grows with the file.
+    cursor.execute("PRAGMA auto_vacuum")
+    if cursor.fetchone()[0] != 2:
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cursor.execute("VACUUM")
+
+
+MIGRATIONS = [
+    Migration(1, "base schema", _base_schema, build=(_rebuild_fts,)),
+    Migration(2, "normalize tasks.due_date", None, backfill=_normalize_due_dates),
+    Migration(3, "normalize users.last_login", None, backfill=_normalize_last_logins),
+    Migration(4, "add tasks.due_day", _due_day_column, build=_DUE_DAY_INDEXES),
+    Migration(5, "add tasks.priority_rank and sort indexes", _priority_rank_column, build=_SORT_INDEXES),
+    Migration(6, "task change journal", _change_journal),
+    Migration(7, "archive table for completed tasks", _archive_table, build=(_COMPLETED_INDEX,),
+              backfill=_backfill_completed_days),
+    Migration(8, "incremental auto_vacuum", None, standalone=_incremental_auto_vacuum),
+]
+LATEST = MIGRATIONS[-1].version
+
+
+# ===== runner =====
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+@contextmanager
+def _transaction(conn):
+    # conn must be in autocommit mode (isolation_level=None)
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        yield cursor
+        cursor.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+
+
+def _set_version(cursor, version):
+    # Another process may have got further meanwhile
+    cursor.execute("PRAGMA user_version")
+    if cursor.fetchone()[0] < version:
+        cursor.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def _has_table(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def _deferred(migration):
+    return bool(migration.build) or migration.backfill is not None or migration.standalone is not None
+
+
+def migrate(conn, batch_size=BATCH_SIZE, progress=None, pause=BATCH_PAUSE, defer=False):
+    # Brings conn's database schema up to LATEST and returns the versions
+    # applied. With defer=True work that grows with the data is only
+    # recorded, for run_pending() to do later; otherwise it runs before this
+    # returns.
+    applied = []
+    fresh = current_version(conn) == 0 and not _has_table(conn.cursor(), "tasks")
+    for migration in MIGRATIONS:
+        if current_version(conn) >= migration.version:
+            continue
+        with _transaction(conn) as cursor:
+            if migration.apply is not None:
+                migration.apply(cursor)
+            if _deferred(migration):
+                # after_id NULL: build not done yet
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS schema_pending (version INTEGER PRIMARY KEY, after_id INTEGER)"
+                )
+                cursor.execute("INSERT OR IGNORE INTO schema_pending (version) VALUES (?)", (migration.version,))
+            _set_version(cursor, migration.version)
+        applied.append(migration.version)
+    if fresh or not defer:
+        run_pending(conn, batch_size, progress, pause)
+    return applied
+
+
+def pending(conn):
+    # Versions with deferred work not finished, in the order it runs
+    cursor = conn.cursor()
+    if not _has_table(cursor, "schema_pending"):
+        return []
+    cursor.execute("SELECT version FROM schema_pending ORDER BY version")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def run_pending(conn, batch_size=BATCH_SIZE, progress=None, pause=BATCH_PAUSE):
+    # Does the deferred work of every pending step and returns the versions
+    # finished. progress(migration, last_id) is called after every backfill batch.
+    steps = {migration.version: migration for migration in MIGRATIONS}
+    finished = []
+    for version in pending(conn):
+        migration = steps[version]
+        row = conn.execute("SELECT after_id FROM schema_pending WHERE version = ?", (version,)).fetchone()
+        if row is None:
+            continue  # another process finished it
+        after_id = row[0]
+        if after_id is None:
+            for statement in migration.build:
+                with _transaction(conn) as cursor:
+                    if callable(statement):
+                        statement(cursor)
+                    else:
+                        cursor.execute(statement)
+            with _transaction(conn) as cursor:
+                cursor.execute("UPDATE schema_pending SET after_id = 0 WHERE version = ?", (version,))
+            after_id = 0
+        while migration.backfill is not None:
+            with _transaction(conn) as cursor:
+                after_id = migration.backfill(cursor, after_id, batch_size)
+                cursor.execute(
+                    "UPDATE schema_pending SET after_id = max(after_id, ?) WHERE version = ?",
+                    (after_id or 0, version)
+                )
+            if after_id is None:
+                break
+            if progress is not None:
+                progress(migration, after_id)
+            time.sleep(pause)
+        if migration.standalone is not None:
+            migration.standalone(conn.cursor())
+        with _transaction(conn) as cursor:
+            cursor.execute("DELETE FROM schema_pending WHERE version = ?", (version,))
+        finished.append(version)
+    return finished
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade a task database to the latest schema.")
+    parser.add_argument("db", nargs="?", default="tasks.db")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, isolation_level=None, timeout=5)
+    conn.execute("PRAGMA journal_mode = WAL")
+    before = current_version(conn)
+
+    def progress(migration, last_id):
+        print(f"  {migration.name}: up to id {last_id}")
+
+    applied = migrate(conn, args.batch_size, progress)
+    conn.close()
+    if applied:
+        print(f"{args.db}: schema version {before} -> {applied[-1]}")
+    else:
+        print(f"{args.db}: already at schema version {before}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import hashlib
+import hmac
+import os
+import time
+
+# Stored as "pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>".
+# Rows written before salting hold a bare unsalted SHA-256 hex digest.
+ALGORITHM = "pbkdf2_sha256"
+DEFAULT_ITERATIONS = 600_000
+SALT_BYTES = 16
+
+
+def hash_password(password, iterations=DEFAULT_ITERATIONS):
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"{ALGORITHM}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def is_legacy(stored):
+    return "$" not in stored
+
+
+def verify_password(password, stored, iterations=DEFAULT_ITERATIONS):
+    # Returns (matches, needs_rehash)
+    if is_legacy(stored):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored), True
+    try:
+        algorithm, rounds, salt, expected = stored.split("$")
+        rounds = int(rounds)
+        salt = bytes.fromhex(salt)
+    except ValueError:
+        return False, False
+    if algorithm != ALGORITHM:
+        return False, False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, rounds).hex()
+    return hmac.compare_digest(digest, expected), rounds < iterations
+
+
+def burn(iterations=DEFAULT_ITERATIONS):
+    # Same cost as a real check, so unknown usernames are not faster to reject
+    hashlib.pbkdf2_hmac("sha256", b"", b"\0" * SALT_BYTES, iterations)
+
+
+def calibrate_iterations(target_ms=250, probe=50_000):
+    # Iteration count that takes about target_ms on this machine
+    start = time.perf_counter()
+    hashlib.pbkdf2_hmac("sha256", b"probe", b"\0" * SALT_BYTES, probe)
+    per_iteration = (time.perf_counter() - start) / probe
+    return max(100_000, int(target_ms / 1000 / per_iteration) // 1000 * 1000)
@@ -0,0 +1,134 @@
+import sqlite3
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+
+class _JobSignals(QObject):
+    finished = pyqtSignal(int, object)  # generation, rows (None when cancelled)
+    failed = pyqtSignal(int, str)
+
+
+class _QueryJob(QRunnable):
+    def __init__(self, db, generation, user_id, filters, order_by, limit, signals):
+        super().__init__()
+        self.db = db
+        self.generation = generation
+        self.user_id = user_id
+        self.filters = filters
+        self.order_by = order_by
+        self.limit = limit
+        self.signals = signals
+        self.cancelled = False
+        self._conn = None
+
+    def cancel(self):
+        self.cancelled = True
+        conn = self._conn
+        if conn is not None:
+            conn.interrupt()  # aborts a statement running on the worker thread
+
+    def run(self):
+        rows = None
+        try:
+            if not self.cancelled:
+                self._conn = self.db.reader()  # this pool thread's connection
+                rows = self.db.query_tasks(
+                    self.user_id, order_by=self.order_by, limit=self.limit, **self.filters
+                )
+        except (sqlite3.Error, ValueError) as e:
+            if not self.cancelled:
+                self.signals.failed.emit(self.generation, str(e))
+                return
+        finally:
+            self._conn = None
+        self.signals.finished.emit(self.generation, None if self.cancelled else rows)
+
+
+class TaskQueryScheduler(QObject):
+    # Coalesces filter changes and runs the first-page query on a worker thread.
+    # Only the newest request is ever delivered; older ones are dropped or interrupted.
+    resultsReady = pyqtSignal(object, object, object)  # filters, order_by, rows
+    queryFailed = pyqtSignal(str)
+
+    DEBOUNCE_MS = 250
+
+    def __init__(self, db, user_id, page_size, debounce_ms=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.user_id = user_id
+        self.page_size = page_size
+        self.pool = QThreadPool.globalInstance()
+
+        self._generation = 0
+        self._epoch = 0  # bumped by note_change()
+        self._request = None
+        self._job = None
+        self._job_epoch = 0
+        self._jobs = {}  # generation -> job, kept alive until the pool is done with it
+
+        self._signals = _JobSignals()
+        self._signals.finished.connect(self._deliver)
+        self._signals.failed.connect(self._fail)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS if debounce_ms is None else debounce_ms)
+        self._timer.timeout.connect(self._dispatch)
+
+    def schedule(self, filters, order_by=None):
+        self._request = (filters, order_by)
+        self._generation += 1
+        self._timer.start()
+
+    def run_now(self, filters, order_by=None):
+        self._request = (filters, order_by)
+        self._generation += 1
+        self._timer.stop()
+        self._dispatch()
+
+    def note_change(self):
+        # A write landed; an in-flight result may predate it
+        self._epoch += 1
+
+    def cancel(self):
+        self._generation += 1
+        self._timer.stop()
+        self._cancel_job()
+
+    def _cancel_job(self):
+        if self._job is not None:
+            if self.pool.tryTake(self._job):
+                self._jobs.pop(self._job.generation, None)
+            else:
+                self._job.cancel()
+            self._job = None
+
+    def _dispatch(self):
+        if self._request is None:
+            return
+        self._cancel_job()
+        filters, order_by = self._request
+        self._job_epoch = self._epoch
+        self._job = _QueryJob(
+            self.db, self._generation, self.user_id, filters, order_by,
+            self.page_size, self._signals
+        )
+        self._job.setAutoDelete(False)
+        self._jobs[self._generation] = self._job
+        self.pool.start(self._job)
+
+    def _deliver(self, generation, rows):
+        self._jobs.pop(generation, None)
+        if generation != self._generation or rows is None:
+            return  # stale or cancelled
+        self._job = None
+        if self._job_epoch != self._epoch:
+            self._dispatch()  # the data changed under the query; run it again
+            return
+        filters, order_by = self._request
+        self.resultsReady.emit(filters, order_by, rows)
+
+    def _fail(self, generation, message):
+        self._jobs.pop(generation, None)
+        if generation == self._generation:
+            self._job = None
+            self.queryFailed.emit(message)
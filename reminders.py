@@ -0,0 +1,170 @@
+import heapq
+import logging
+from datetime import datetime, time, timedelta
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from db_manager import epoch_day, from_epoch_day
+
+logger = logging.getLogger("task_manager.reminders")
+
+
+class SystemClock:
+    def now(self):
+        return datetime.now()
+
+
+def desktop_notifier():
+    # notifier(title, message) backed by plyer, or None if it is not installed
+    try:
+        from plyer import notification
+    except ImportError:
+        return None
+
+    def notify(title, message):
+        try:
+            notification.notify(title=title, message=message, app_name="Task Manager", timeout=10)
+        except Exception as e:  # no notification backend on this desktop
+            logger.warning("desktop notification failed: %s", e)
+    return notify
+
+
+class ReminderScheduler(QObject):
+    # Keeps one user's pending tasks in a min-heap keyed by reminder time and
+    # arms a single QTimer for the earliest one. Only tasks due within
+    # HORIZON_DAYS are loaded; reload() at midnight moves that window on.
+    # Changes arrive through apply_change() (DBManager change events), so
+    # nothing rescans the table.
+    #
+    # Heap entries are never edited in place: a change pushes a new entry and
+    # _scheduled records which one is current; stale entries are skipped when
+    # they reach the top.
+    reminderDue = pyqtSignal(object)  # Task
+
+    REMIND_AT = time(9, 0)  # time of day reminders go off
+    LEAD_DAYS = 1  # remind this many days before the due date
+    HORIZON_DAYS = LEAD_DAYS + 1  # due dates loaded ahead of today: what can fire before the next reload
+    MAX_WAIT_MS = 60 * 60 * 1000  # re-check at least hourly (suspend, clock changes)
+    SUMMARY_TASKS = 5  # tasks a summary notification names before "and N more"
+
+    def __init__(self, db, user_id, clock=None, notifier=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.user_id = user_id
+        self.clock = clock or SystemClock()
+        self.notifier = notifier  # notifier(title, message); see desktop_notifier()
+        self._heap = []  # (remind_at, task_id)
+        self._scheduled = {}  # task_id -> (remind_at, task)
+        self._fired = {}  # task_id -> due_day already reminded about
+        self._until = -1  # last due day loaded; set by reload()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.fire_due)
+
+    def remind_at(self, task):
+        due = from_epoch_day(task.due_day)
+        return datetime.combine(due, self.REMIND_AT) - timedelta(days=self.LEAD_DAYS)
+
+    # ===== heap maintenance =====
+    def reload(self):
+        # Call at midnight too, to move the window of loaded due dates on
+        today = epoch_day(self.clock.now().date())
+        self._until = today + self.HORIZON_DAYS
+        self._fired = {task_id: day for task_id, day in self._fired.items() if day >= today}
+        self._scheduled = {}
+        for task in self.db.get_pending_due(self.user_id, today, self._until):
+            if self._fired.get(task.id) != task.due_day:
+                self._scheduled[task.id] = (self.remind_at(task), task)
+        self._heap = [(at, task_id) for task_id, (at, _) in self._scheduled.items()]
+        heapq.heapify(self._heap)
+        self._arm()
+
+    def apply_change(self, event, user_id, task):
+        # Same arguments as DBManager.subscribe callbacks
+        if event == "reset":
+            if user_id in (None, self.user_id):
+                self.reload()
+            return
+        if user_id != self.user_id:
+            return
+        wants_reminder = (
+            event != "deleted" and task.status == "Pending" and task.due_day is not None
+            and epoch_day(self.clock.now().date()) <= task.due_day <= self._until
+            and self._fired.get(task.id) != task.due_day
+        )
+        current = self._scheduled.get(task.id)
+        if not wants_reminder:
+            if current is not None:
+                del self._scheduled[task.id]
+                self._arm()
+            return
+        at = self.remind_at(task)
+        self._scheduled[task.id] = (at, task)
+        if current is None or current[0] != at:
+            heapq.heappush(self._heap, (at, task.id))
+            self._compact()
+            self._arm()
+
+    def _compact(self):
+        # Drop stale entries once they dominate the heap
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._scheduled):
+            self._heap = [(at, task_id) for task_id, (at, _) in self._scheduled.items()]
+            heapq.heapify(self._heap)
+
+    def _peek(self):
+        while self._heap:
+            at, task_id = self._heap[0]
+            current = self._scheduled.get(task_id)
+            if current is not None and current[0] == at:
+                return at
+            heapq.heappop(self._heap)  # stale
+        return None
+
+    def next_reminder(self):
+        return self._peek()
+
+    def pending_count(self):
+        return len(self._scheduled)
+
+    # ===== firing =====
+    def _arm(self):
+        at = self._peek()
+        if at is None:
+            self.timer.stop()
+            return
+        wait_ms = (at - self.clock.now()).total_seconds() * 1000
+        self.timer.start(int(min(max(wait_ms, 0), self.MAX_WAIT_MS)))
+
+    def fire_due(self):
+        # Sends every reminder whose time has come, then re-arms the timer.
+        # Several at once (e.g. after startup or a suspend) make one notification.
+        now = self.clock.now()
+        due = []
+        while True:
+            at = self._peek()
+            if at is None or at > now:
+                break
+            _, task_id = heapq.heappop(self._heap)
+            _, task = self._scheduled.pop(task_id)
+            self._fired[task_id] = task.due_day
+            due.append(task)
+        if due:
+            self._send(due)
+        self._arm()
+
+    def _when(self, task):
+        days = task.due_day - epoch_day(self.clock.now().date())
+        return "today" if days <= 0 else "tomorrow" if days == 1 else f"in {days} days"
+
+    def _send(self, tasks):
+        if self.notifier is not None:
+            if len(tasks) == 1:
+                self.notifier("Task due " + self._when(tasks[0]), tasks[0].task)
+            else:
+                lines = [f"{task.task} ({self._when(task)})" for task in tasks[:self.SUMMARY_TASKS]]
+                if len(tasks) > self.SUMMARY_TASKS:
+                    lines.append(f"and {len(tasks) - self.SUMMARY_TASKS} more")
+                self.notifier(f"{len(tasks)} tasks due", "\n".join(lines))
+        for task in tasks:
+            self.reminderDue.emit(task)
+
+    def stop(self):
+        self.timer.stop()
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+
+
+class TaskCache:
+    # Bounded LRU of task query results, partitioned by user so a write only
+    # drops that user's entries. Thread safe; DBManager owns one per instance.
+    #
+    # Results are stored as tuples and handed out as fresh lists. A reader
+    # takes generation(user_id) before querying and passes it to put(); if
+    # the user's tasks changed in the meantime the result is not stored, so
+    # a query racing a commit can never cache pre-commit rows.
+
+    def __init__(self, maxsize=128, max_rows=20000):
+        self.maxsize = maxsize
+        self.max_rows = max_rows  # larger results are not cached
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (user_id, rows)
+        self._keys_by_user = {}  # user_id -> set of keys
+        self._generations = {}  # user_id -> int
+        self._epoch = 0  # bumped by clear()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def generation(self, user_id):
+        with self._lock:
+            return self._epoch, self._generations.get(user_id, 0)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key, user_id, rows, generation):
+        if self.maxsize <= 0 or len(rows) > self.max_rows:
+            return
+        with self._lock:
+            if generation != (self._epoch, self._generations.get(user_id, 0)):
+                return  # written since the query started
+            self._entries[key] = (user_id, tuple(rows))
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                old_key, (old_user, _) = self._entries.popitem(last=False)
+                self._keys_by_user[old_user].discard(old_key)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in self._keys_by_user.pop(user_id, ()):
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.invalidations = 0
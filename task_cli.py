@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import sys
+from datetime import date
+from functools import partial
+
+from db_manager import DBManager
+import task_io
+
+# Headless entry point for scripts and cron jobs: python -m task_cli --help
+# Imports no Qt, and listings stream page by page instead of loading every row.
+
+PAGE_SIZE = 1000
+ORDER_BY = tuple(f"{column}{direction}" for column in DBManager.SORTABLE_COLUMNS for direction in ("", " ASC", " DESC"))
+
+
+def _user_id(db, username):
+    user_id = db.get_user_id(username)
+    if user_id is None:
+        raise SystemExit(f"task_cli: no user named {username!r}")
+    return user_id
+
+
+def _order_by(value):
+    # "Priority  desc" -> "priority DESC"; argparse then checks it against ORDER_BY
+    column, _, direction = value.strip().partition(" ")
+    return f"{column.lower()} {direction.strip().upper()}".rstrip()
+
+
+def iter_query(db, user_id, limit=None, **filters):
+    # Keyset pages through query_tasks, so memory stays at one page
+    after = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = PAGE_SIZE if remaining is None else min(PAGE_SIZE, remaining)
+        page = db.query_tasks(user_id, limit=size, after=after, **filters)
+        yield from page
+        if len(page) < size:
+            return
+        after = page[-1]
+        if remaining is not None:
+            remaining -= len(page)
+
+
+# ===== output =====
+def write_text(out, tasks):
+    count = 0
+    for t in tasks:
+        out.write(f"{t.id:>7}  {t.status:<9}  {t.due_date or '-':<10}  {t.priority or '-':<6}  {t.task}\n")
+        count += 1
+    return count
+
+
+WRITERS = {
+    "text": write_text,
+    "csv": partial(task_io.write_csv, with_id=True),
+    "jsonl": partial(task_io.write_jsonl, with_id=True),
+}
+
+
+# ===== commands =====
+def cmd_list(db, args):
+    tasks = iter_query(
+        db, _user_id(db, args.user), limit=args.limit, keyword=args.keyword, status=args.status,
+        priority=args.priority, due_from=args.due_from, due_to=args.due_to, order_by=args.order_by
+    )
+    WRITERS[args.format](sys.stdout, tasks)
+
+
+def cmd_add(db, args):
+    user_id = _user_id(db, args.user)
+    if args.task:
+        added = db.add_tasks_bulk(user_id, [
+            {"task": " ".join(args.task), "due_date": args.due and str(args.due), "priority": args.priority}
+        ])
+    else:
+        try:
+            added = task_io.import_tasks(db, user_id, sys.stdin, args.format)
+        except ValueError as e:
+            raise SystemExit(f"task_cli: stdin {e}")
+    print(f"added {added} tasks", file=sys.stderr)
+
+
+def cmd_export(db, args):
+    user_id = _user_id(db, args.user)
+    if args.output:
+        count = task_io.export_file(db, user_id, args.output, args.format)
+    else:
+        count = task_io.export_tasks(db, user_id, sys.stdout, args.format or "csv")
+    print(f"exported {count} tasks", file=sys.stderr)
+
+
+def cmd_mark_overdue(db, args):
+    print(db.mark_overdue(args.today))
+
+
+def cmd_archive(db, args):
+    print(db.archive_completed(args.days, args.today))
+
+
+def cmd_stats(db, args):
+    stats = dict(db.get_user_stats())
+    if args.user:
+        stats["tasks"] = db.count_tasks(_user_id(db, args.user))
+    print(json.dumps(stats, indent=2))
+
+
+def cmd_analyze(db, args):
+    print(db.maintenance.analyze() if args.full else db.maintenance.optimize())
+
+
+def cmd_vacuum(db, args):
+    maintenance = db.maintenance
+    print(maintenance.vacuum() if args.full else maintenance.incremental_vacuum(args.pages))
+
+
+def cmd_check(db, args):
+    problems = db.maintenance.quick_check()
+    for problem in problems:
+        print(problem)
+    print(db.maintenance.history[-1], file=sys.stderr)
+    return 1 if problems else 0
+
+
+def cmd_backup(db, args):
+    print(db.maintenance.backup(args.path))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m task_cli", description="Task Manager command line.")
+    parser.add_argument("--db", default=os.environ.get("TASKS_DB", "tasks.db"), help="database file")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    user = argparse.ArgumentParser(add_help=False)
+    user.add_argument("--user", required=True, help="username whose tasks to use")
+
+    p = commands.add_parser("list", parents=[user], help="list tasks matching filters")
+    p.add_argument("keyword", nargs="?", help="text to search for")
+    p.add_argument("--status", choices=task_io.STATUSES)
+    p.add_argument("--priority", choices=task_io.PRIORITIES)
+    p.add_argument("--due-from", type=date.fromisoformat, metavar="YYYY-MM-DD")
+    p.add_argument("--due-to", type=date.fromisoformat, metavar="YYYY-MM-DD")
+    p.add_argument("--order-by", type=_order_by, choices=ORDER_BY, metavar="COLUMN [ASC|DESC]",
+                   help=f"sort column, one of {', '.join(DBManager.SORTABLE_COLUMNS)}")
+    p.add_argument("--limit", type=int)
+    p.add_argument("--format", choices=sorted(WRITERS), default="text")
+    p.set_defaults(handler=cmd_list)
+
+    p = commands.add_parser("add", parents=[user], help="add one task, or many read from stdin")
+    p.add_argument("task", nargs="*", help="task text; omit to read CSV or JSONL from stdin")
+    p.add_argument("--due", type=date.fromisoformat, metavar="YYYY-MM-DD")
+    p.add_argument("--priority", choices=task_io.PRIORITIES)
+    p.add_argument("--format", choices=("csv", "jsonl"), default="csv",
+                   help="stdin format; nothing is added if any row is invalid")
+    p.set_defaults(handler=cmd_add)
+
+    p = commands.add_parser("export", parents=[user], help="write all tasks, archived ones included")
+    p.add_argument("--output", "-o", help="file to write (default stdout)")
+    p.add_argument("--format", choices=("csv", "jsonl"), help="default: from --output's extension, else csv")
+    p.set_defaults(handler=cmd_export)
+
+    p = commands.add_parser("mark-overdue", help="mark pending tasks due before today as Overdue")
+    p.add_argument("--today", type=date.fromisoformat, metavar="YYYY-MM-DD")
+    p.set_defaults(handler=cmd_mark_overdue)
+
+    p = commands.add_parser("archive", help="move old completed tasks to the archive")
+    p.add_argument("--days", type=int, help=f"completed at least this long ago (default {DBManager.ARCHIVE_AFTER_DAYS})")
+    p.add_argument("--today", type=date.fromisoformat, metavar="YYYY-MM-DD")
+    p.set_defaults(handler=cmd_archive)
+
+    p = commands.add_parser("stats", help="user counts, and task counts with --user")
+    p.add_argument("--user")
+    p.set_defaults(handler=cmd_stats)
+
+    p = commands.add_parser("analyze", help="refresh stale query planner statistics")
+    p.add_argument("--full", action="store_true", help="run a full ANALYZE instead of PRAGMA optimize")
+    p.set_defaults(handler=cmd_analyze)
+
+    p = commands.add_parser("vacuum", help="release free pages to the filesystem")
+    p.add_argument("--pages", type=int, help="release at most this many (default all)")
+    p.add_argument("--full", action="store_true", help="rebuild the whole file (blocks writers)")
+    p.set_defaults(handler=cmd_vacuum)
+
+    p = commands.add_parser("check", help="run PRAGMA quick_check; exit status 1 on problems")
+    p.set_defaults(handler=cmd_check)
+
+    p = commands.add_parser("backup", help="copy the live database with the SQLite backup API")
+    p.add_argument("path")
+    p.set_defaults(handler=cmd_backup)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.exists(args.db):
+        # DBManager would create and migrate an empty database at a mistyped path
+        raise SystemExit(f"task_cli: no database at {args.db!r} (create one with python migrations.py)")
+    db = DBManager(args.db, cache_size=0)  # one-shot reads; caching would only cost memory
+    try:
+        db.finish_migrations()  # a one-shot command can wait for deferred schema work
+        status = args.handler(db, args) or 0
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # output piped into head etc.; silence the second error at exit
+        sys.stdout = open(os.devnull, "w")
+        return 1
+    finally:
+        db.close()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
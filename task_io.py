@@ -0,0 +1,109 @@
+import csv
+import json
+from datetime import date
+from itertools import islice
+
+FIELDS = ("task", "status", "due_date", "priority")
+STATUSES = ("Pending", "Completed", "Overdue")
+PRIORITIES = ("High", "Medium", "Low")
+CHUNK_SIZE = 1000
+
+
+def _format_for(path, fmt):
+    if fmt:
+        return fmt
+    return "jsonl" if str(path).endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _checked(row, line_no):
+    # row with blank fields as None and due_date as YYYY-MM-DD; ValueError naming the line otherwise
+    row = {f: str(row.get(f) or "").strip() or None for f in FIELDS}
+    if row["task"] is None:
+        raise ValueError(f"line {line_no}: missing task")
+    if row["status"] is not None and row["status"] not in STATUSES:
+        raise ValueError(f"line {line_no}: status {row['status']!r} is not one of {', '.join(STATUSES)}")
+    if row["priority"] is not None and row["priority"] not in PRIORITIES:
+        raise ValueError(f"line {line_no}: priority {row['priority']!r} is not one of {', '.join(PRIORITIES)}")
+    if row["due_date"] is not None:
+        try:
+            row["due_date"] = date.fromisoformat(row["due_date"]).isoformat()
+        except ValueError:
+            raise ValueError(f"line {line_no}: due_date {row['due_date']!r} is not a YYYY-MM-DD date") from None
+    return row
+
+
+# ===== readers: one checked dict per task, read lazily =====
+def iter_csv(fileobj):
+    for line_no, row in enumerate(csv.DictReader(fileobj), start=2):
+        yield _checked(row, line_no)
+
+
+def iter_jsonl(fileobj):
+    for line_no, line in enumerate(fileobj, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {line_no}: {e}") from None
+        yield _checked(row, line_no)
+
+
+# ===== writers: with_id=True adds a leading id field, which imports ignore =====
+def write_csv(fileobj, tasks, with_id=False):
+    writer = csv.writer(fileobj)
+    writer.writerow(("id",) + FIELDS if with_id else FIELDS)
+    count = 0
+    for t in tasks:
+        row = (t.task, t.status, t.due_date or "", t.priority)
+        writer.writerow((t.id,) + row if with_id else row)
+        count += 1
+    return count
+
+
+def write_jsonl(fileobj, tasks, with_id=False):
+    count = 0
+    for t in tasks:
+        row = {"id": t.id} if with_id else {}
+        row.update(task=t.task, status=t.status, due_date=t.due_date, priority=t.priority)
+        fileobj.write(json.dumps(row) + "\n")
+        count += 1
+    return count
+
+
+# ===== import / export =====
+def import_tasks(db, user_id, fileobj, fmt="csv", chunk_size=CHUNK_SIZE):
+    # Read and inserted a chunk at a time, so memory stays bounded, but in
+    # one transaction: a bad row (ValueError) leaves nothing imported
+    rows = iter_jsonl(fileobj) if fmt == "jsonl" else iter_csv(fileobj)
+    total = 0
+    with db.transaction():
+        for chunk in _chunks(rows, chunk_size):
+            total += db.add_tasks_bulk(user_id, chunk)
+    return total
+
+
+def export_tasks(db, user_id, fileobj, fmt="csv", chunk_size=CHUNK_SIZE):
+    tasks = db.iter_tasks(user_id, chunk_size=chunk_size)
+    if fmt == "jsonl":
+        return write_jsonl(fileobj, tasks)
+    return write_csv(fileobj, tasks)
+
+
+def import_file(db, user_id, path, fmt=None, chunk_size=CHUNK_SIZE):
+    with open(path, newline="", encoding="utf-8") as f:
+        return import_tasks(db, user_id, f, _format_for(path, fmt), chunk_size)
+
+
+def export_file(db, user_id, path, fmt=None, chunk_size=CHUNK_SIZE):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        return export_tasks(db, user_id, f, _format_for(path, fmt), chunk_size)
@@ -0,0 +1,332 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QEvent, QRect, QSize, pyqtSignal
+from PyQt5.QtGui import QColor, QBrush, QPalette
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QApplication
+from datetime import date
+from db_manager import OVERDUE, DUE_SOON, Task, epoch_day
+
+# column index -> tasks column used for ORDER BY
+SORT_COLUMNS = {0: "task", 1: "status", 2: "due_date", 3: "priority"}
+# ORDER BY column -> row field it sorts on (DBManager.SORT_KEYS)
+SORT_FIELDS = {"id": 0, "task": 1, "status": 2, "due_date": 5, "priority": 6}
+
+# Model role carrying a cell's style key: the row's urgency class, else the
+# priority for the priority column, else None
+STYLE_ROLE = Qt.UserRole + 1
+
+# theme -> style key -> (background, text)
+ROW_COLORS = {
+    "light": {
+        OVERDUE: ("#ffdcdc", "#000000"),
+        DUE_SOON: ("#fff5c8", "#000000"),
+        "High": ("#ffc8c8", "#000000"),
+        "Medium": ("#ffffc8", "#000000"),
+        "Low": ("#c8ffc8", "#000000"),
+    },
+    "dark": {
+        OVERDUE: ("#6e2f2f", "#fbe3e3"),
+        DUE_SOON: ("#62521f", "#fff4cc"),
+        "High": ("#5a3030", "#f0f0f0"),
+        "Medium": ("#55512a", "#f0f0f0"),
+        "Low": ("#2f5233", "#f0f0f0"),
+    },
+}
+_palettes = {}
+
+
+def row_palette(theme):
+    # Brushes are built once per theme and shared by every cell painted with them
+    palette = _palettes.get(theme)
+    if palette is None:
+        palette = _palettes[theme] = {
+            key: (QBrush(QColor(background)), QBrush(QColor(text)))
+            for key, (background, text) in ROW_COLORS[theme].items()
+        }
+    return palette
+
+
+class TaskTableModel(QAbstractTableModel):
+    HEADERS = ["Task", "Status", "Due Date", "Priority", "Delete"]
+    DELETE_COLUMN = 4
+    EDITABLE_COLUMNS = (0, 2, 3)
+    PRIORITY_COLUMN = 3
+    PAGE_SIZE = 200
+
+    cellEdited = pyqtSignal(int, int, str)  # task_id, column, value
+
+    def __init__(self, db, user_id, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.user_id = user_id
+        self.filters = None  # set by the first reload()
+        self.order_by = None
+        self._rows = []  # [*Task fields, urgency]
+        self._positions = {}  # task_id -> row, rebuilt lazily after inserts/removals
+        self._exhausted = True
+
+    # ===== loading =====
+    def reload(self, filters=None):
+        if filters is not None:
+            self.filters = filters
+        self.beginResetModel()
+        self._rows = []
+        self._positions = {}
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def set_first_page(self, filters, order_by, page):
+        # Reset to a page fetched elsewhere (see TaskQueryScheduler)
+        today = epoch_day(date.today())
+        self.beginResetModel()
+        self.filters = filters
+        self.order_by = order_by
+        self._rows = [self._make_row(task, today) for task in page]
+        self._positions = {row[0]: i for i, row in enumerate(self._rows)}
+        self._exhausted = len(page) < self.PAGE_SIZE
+        self.endResetModel()
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent):
+        if parent.isValid() or self._exhausted:
+            return
+        after = Task._make(self._rows[-1][:-1]) if self._rows else None
+        with self.db.span("fetch_page"):
+            page = self.db.query_tasks(
+                self.user_id, order_by=self.order_by,
+                limit=self.PAGE_SIZE, after=after, **self.filters
+            )
+        if len(page) < self.PAGE_SIZE:
+            self._exhausted = True
+        if not page:
+            return
+        today = epoch_day(date.today())
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(self._make_row(task, today) for task in page)
+        if self._positions is not None:
+            self._positions.update((task[0], first + i) for i, task in enumerate(page))
+        self.endInsertRows()
+
+    @staticmethod
+    def _make_row(task, today):
+        # task is a db_manager.Task; urgency is classified once here, not per paint
+        return [*task, task.urgency(today)]
+
+    def refresh_urgency(self, today=None):
+        # Reclassifies the loaded rows for a new day; a single dataChanged
+        # spans the rows whose class moved, so only visible cells repaint
+        today = epoch_day(today or date.today())
+        first = last = None
+        for i, row in enumerate(self._rows):
+            urgency = Task._make(row[:-1]).urgency(today)
+            if urgency != row[-1]:
+                row[-1] = urgency
+                first = i if first is None else first
+                last = i
+        if first is not None:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, self.DELETE_COLUMN), [STYLE_ROLE])
+
+    def task_id(self, row):
+        return self._rows[row][0]
+
+    def row_of(self, task_id):
+        if self._positions is None:
+            self._positions = {row[0]: i for i, row in enumerate(self._rows)}
+        return self._positions.get(task_id)
+
+    # ===== incremental updates =====
+    def apply_change(self, event, user_id, task):
+        # Patch a single row in place after add/update/delete
+        if user_id != self.user_id or self.filters is None:
+            return
+        current = self.row_of(task[0])
+        if event == "deleted" or not self._matches(task):
+            if current is not None:
+                self._remove_row(current)
+            return
+
+        row = self._make_row(task, epoch_day(date.today()))
+        if current is not None:
+            if self._fits_at(current, row):
+                self._rows[current] = row
+                self.refresh_row(current)
+                return
+            self._remove_row(current)
+
+        position = self._insert_position(row)
+        if position == len(self._rows) and not self._exhausted:
+            return  # belongs to a page that has not been fetched yet
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._rows.insert(position, row)
+        self._positions = None
+        self.endInsertRows()
+
+    def _remove_row(self, position):
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self._rows[position]
+        self._positions = None
+        self.endRemoveRows()
+
+    def refresh_task(self, task_id):
+        row = self.row_of(task_id)
+        if row is not None:
+            self.refresh_row(row)
+
+    def refresh_row(self, row):
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.DELETE_COLUMN))
+
+    def _matches(self, task):
+        if not self.db.matches_keyword(self.filters.get("keyword"), task.task):
+            return False
+        if self.filters.get("status") and task.status != self.filters["status"]:
+            return False
+        if self.filters.get("priority") and task.priority != self.filters["priority"]:
+            return False
+        if task.due_day is not None:
+            due_from, due_to = self.filters.get("due_from"), self.filters.get("due_to")
+            if due_from is not None and task.due_day < epoch_day(due_from):
+                return False
+            if due_to is not None and task.due_day > epoch_day(due_to):
+                return False
+        return True
+
+    def _sort_key(self, row):
+        # mirrors query_tasks: ORDER BY <key>, id, with NULL keys lowest
+        if self.order_by is None:
+            return (row[0],)
+        value = row[SORT_FIELDS[self.order_by.split()[0]]]
+        return (value is not None, "" if value is None else value, row[0])
+
+    def _descending(self):
+        return self.order_by is not None and self.order_by.endswith("DESC")
+
+    def _before(self, a, b):
+        # True when row a sorts before row b in the current order
+        if self._descending():
+            return self._sort_key(a) > self._sort_key(b)
+        return self._sort_key(a) < self._sort_key(b)
+
+    def _fits_at(self, position, row):
+        if position > 0 and not self._before(self._rows[position - 1], row):
+            return False
+        if position + 1 < len(self._rows) and not self._before(row, self._rows[position + 1]):
+            return False
+        return True
+
+    def _insert_position(self, row):
+        lo, hi = 0, len(self._rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._before(self._rows[mid], row):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    # ===== Qt model API =====
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        if index.column() in self.EDITABLE_COLUMNS:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        col = index.column()
+        if role == Qt.UserRole:
+            return row[0]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if col == self.DELETE_COLUMN:
+                return None
+            return row[col + 1] or ""
+        if role == STYLE_ROLE:
+            urgency = row[-1]
+            if urgency is None and col == self.PRIORITY_COLUMN:
+                return row[4]
+            return urgency
+        if role == Qt.ToolTipRole and col == self.DELETE_COLUMN:
+            return "Delete task"
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid() or index.column() not in self.EDITABLE_COLUMNS:
+            return False
+        # The row is refreshed by apply_change once the database accepts the edit
+        self.cellEdited.emit(self._rows[index.row()][0], index.column(), str(value).strip())
+        return True
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        db_column = SORT_COLUMNS.get(column)
+        if db_column is None:
+            return
+        self.order_by = f"{db_column} {'DESC' if order == Qt.DescendingOrder else 'ASC'}"
+        if self.filters is not None:
+            self.reload()
+
+
+class TaskRowDelegate(QStyledItemDelegate):
+    # Paints cell backgrounds from the shared palette of the current theme,
+    # looked up by the model's STYLE_ROLE. Changing theme swaps the palette
+    # and repaints the viewport; no rows are rebuilt.
+    def __init__(self, parent=None, theme="light"):
+        super().__init__(parent)
+        self.brushes = row_palette(theme)
+
+    def set_theme(self, theme):
+        self.brushes = row_palette(theme)
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        style = self.brushes.get(index.data(STYLE_ROLE))
+        if style is not None:
+            option.backgroundBrush = style[0]
+            option.palette.setBrush(QPalette.Text, style[1])
+
+
+class DeleteButtonDelegate(TaskRowDelegate):
+    # Paints a trash icon instead of hosting one QPushButton per row
+    deleteClicked = pyqtSignal(int)  # task_id
+
+    ICON_SIZE = QSize(20, 20)
+
+    def __init__(self, parent=None, theme="light"):
+        super().__init__(parent, theme)
+        style = QApplication.style()
+        icon_id = QStyle.SP_TrashIcon if hasattr(QStyle, "SP_TrashIcon") else QStyle.SP_DialogCloseButton
+        self.icon = style.standardIcon(icon_id)
+
+    def _icon_rect(self, cell):
+        rect = QRect(0, 0, self.ICON_SIZE.width(), self.ICON_SIZE.height())
+        rect.moveCenter(cell.center())
+        return rect
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        self.icon.paint(painter, self._icon_rect(option.rect))
+
+    def sizeHint(self, option, index):
+        return QSize(32, 32)
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+                and self._icon_rect(option.rect).contains(event.pos())):
+            self.deleteClicked.emit(index.data(Qt.UserRole))
+            return True
+        return super().editorEvent(event, model, option, index)
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def db(tmp_path):
+    from db_manager import DBManager
+    manager = DBManager(str(tmp_path / "tasks.db"), kdf_iterations=1000)
+    yield manager
+    manager.close(optimize=False)
+
+
+@pytest.fixture
+def user_id(db):
+    db.register_user("alice", "secret")
+    return db.login_user("alice", "secret")
+
+
+def spin(ms):
+    # Runs the Qt event loop for ms milliseconds (queued signals, timers)
+    from PyQt5.QtCore import QEventLoop, QTimer
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec_()
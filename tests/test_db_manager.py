@@ -0,0 +1,142 @@
+import hashlib
+import threading
+from datetime import date, timedelta
+
+import passwords
+
+
+def test_finished_threads_release_their_readers(db, user_id):
+    db.add_task(user_id, "x")
+
+    def read():
+        assert db.get_task(1) is not None
+
+    for _ in range(50):
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+    assert len(db._readers) <= db.IDLE_READERS + 1  # + this thread's
+
+
+def test_qt_pool_jobs_reuse_readers(qapp, db):
+    from PyQt5.QtCore import QRunnable, QThreadPool
+
+    class Job(QRunnable):
+        def run(self):
+            db.reader().execute("SELECT 1").fetchone()
+
+    pool = QThreadPool()
+    pool.setMaxThreadCount(2)
+    pool.setExpiryTimeout(10)
+    for _ in range(20):
+        pool.start(Job())
+        pool.waitForDone()
+    assert len(db._readers) <= db.IDLE_READERS + 1
+
+
+def test_matches_keyword_agrees_with_query_tasks(db, user_id):
+    texts = ["fix foo_bar module", "foo bar", "Café menu", "cafe_MENU", 'say "hi" there', "e-mail bob",
+             "email", "__init__ cleanup", "100% done", "a.b.c", "naïve plan", "HI"]
+    ids = {db.add_task(user_id, text).id: text for text in texts}
+    keywords = ["bar", "foo_bar", "foo bar", '"foo bar"', '""', '"" foo', '"_"', "_", "__", "caf", "café",
+                '"cafe menu"', "e-mail", '"e mail"', "mail", "%", "100%", '"', 'hi"', "a.b", "naive",
+                "Hi", "--", "init"]
+    assert db.fts_enabled
+    for keyword in keywords:
+        found = {t.id for t in db.query_tasks(user_id, keyword=keyword)}
+        matched = {i for i, text in ids.items() if db.matches_keyword(keyword, text)}
+        assert matched == found, keyword
+
+
+def test_keyset_pages_cross_null_segments(db, user_id):
+    for i in range(11):
+        db.add_task(user_id, f"task {i % 4}", due_date=None if i % 3 == 0 else f"2026-01-{i % 5 + 1:02d}",
+                    priority=None if i % 4 == 0 else ("High", "Low", "Medium")[i % 3])
+    for order_by in ("due_date", "due_date DESC", "priority", "priority DESC", "task DESC", "id DESC"):
+        key, descending = db.sort_key(order_by)
+        full = db.query_tasks(user_id, order_by=order_by)
+        keys = [(getattr(t, key) is None, getattr(t, key) or 0, t.id) for t in full]
+        # NULLs first ascending, last descending
+        assert keys == sorted(keys, key=lambda k: (not k[0], k[1], k[2]), reverse=descending), order_by
+        paged, after = [], None
+        while True:
+            page = db.query_tasks(user_id, order_by=order_by, limit=3, after=after)
+            paged += page
+            if len(page) < 3:
+                break
+            after = page[-1]
+        assert paged == full, order_by
+
+
+def test_writes_invalidate_only_the_writers_cache(db, user_id):
+    db.register_user("bob", "secret")
+    bob = db.get_user_id("bob")
+    task = db.add_task(user_id, "draft")
+    db.add_task(bob, "bob's")
+    assert [t.task for t in db.query_tasks(user_id, keyword="draft")] == ["draft"]
+    db.query_tasks(bob)
+    hits = db.cache.hits
+    db.query_tasks(user_id, keyword="draft")
+    assert db.cache.hits == hits + 1
+
+    db.update_task(task.id, new_task="final")
+    assert db.query_tasks(user_id, keyword="draft") == []
+    db.query_tasks(bob)
+    assert db.cache.hits == hits + 2  # bob's entry survived alice's write
+    db.update_task_status(task.id, "Completed")
+    assert [t.status for t in db.query_tasks(user_id)] == ["Completed"]
+    db.delete_task(task.id)
+    assert db.query_tasks(user_id) == []
+    db.add_tasks_bulk(user_id, [{"task": "bulk"}])
+    assert [t.task for t in db.query_tasks(user_id)] == ["bulk"]
+
+
+def test_archive_round_trip_keeps_queries_unchanged(db, user_id):
+    for i in range(8):
+        task = db.add_task(user_id, f"report {i}", f"2026-02-{i + 1:02d}", ("High", "Low")[i % 2])
+        if i % 2:
+            db.update_task_status(task.id, "Completed")
+    views = [dict(order_by="due_date DESC"), dict(order_by="priority", limit=3), dict(keyword="report"),
+             dict(status="Completed", order_by="task")]
+
+    def snapshot():
+        db.cache.clear()
+        return [db.query_tasks(user_id, **view) for view in views] + [db.search_tasks(user_id, "report")]
+
+    before = snapshot()
+    assert db.archive_completed(0, date.today() + timedelta(days=1), batch_size=2, pause=0) == 4
+    assert db.conn.execute("SELECT count(*) FROM tasks_archive").fetchone()[0] == 4
+    assert snapshot() == before
+    assert db.query_tasks(user_id, status="Pending", order_by="due_date DESC") == [
+        t for t in before[0] if t.status == "Pending"]
+    assert db.count_tasks(user_id) == {"Pending": 4, "Completed": 4}
+    assert db.get_task(2).status == "Completed"
+
+    db.update_task_status(2, "Pending")  # editing an archived task restores it
+    assert db.restore_tasks([4, 6, 8]) == 3
+    assert db.conn.execute("SELECT count(*) FROM tasks_archive").fetchone()[0] == 0
+    db.update_task_status(2, "Completed")
+    assert snapshot() == before
+
+
+def test_login_rehashes_legacy_and_under_cost_hashes(db):
+    def stored(username):
+        return db.conn.execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()[0]
+
+    with db.transaction():
+        db.conn.execute("INSERT INTO users (username, password) VALUES (?, ?)",
+                        ("old", hashlib.sha256(b"pw").hexdigest()))  # pre-PBKDF2 format
+    assert db.login_user("old", "wrong") is None
+    assert passwords.is_legacy(stored("old"))  # failed logins change nothing
+    user_id = db.login_user("old", "pw")
+    assert user_id == db.get_user_id("old")
+    assert stored("old").startswith(f"pbkdf2_sha256${db.kdf_iterations}$")
+    assert db.login_user("old", "pw") == user_id
+
+    db.register_user("cheap", "pw")
+    db.kdf_iterations *= 2
+    assert db.login_user("cheap", "pw") is not None
+    assert stored("cheap").startswith(f"pbkdf2_sha256${db.kdf_iterations}$")
+    current = stored("cheap")
+    db.login_user("cheap", "pw")
+    assert stored("cheap") == current  # already at cost: left alone
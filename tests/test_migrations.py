@@ -0,0 +1,79 @@
+import sqlite3
+
+import migrations
+from db_manager import DBManager
+
+DEFERRED_INDEXES = {"idx_tasks_user_status_day", "idx_tasks_user_day", "idx_tasks_status_day",
+                    "idx_tasks_user", "idx_tasks_user_rank", "idx_tasks_user_task", "idx_tasks_user_status",
+                    "idx_tasks_completed"}
+
+
+def unversioned_database(path):
+    # The schema from before migrations: no user_version, unnormalized dates
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, "
+                 "password TEXT NOT NULL, last_login TIMESTAMP)")
+    conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, "
+                 "task TEXT NOT NULL, status TEXT DEFAULT 'Pending', due_date TEXT, priority TEXT DEFAULT 'Medium')")
+    conn.execute("INSERT INTO users (username, password) VALUES ('alice', 'x')")
+    conn.execute("INSERT INTO tasks (user_id, task, due_date) VALUES (1, 'alpha', '2024-01-05 10:00:00')")
+    conn.execute("INSERT INTO tasks (user_id, task, status) VALUES (1, 'beta', 'Completed')")
+    conn.close()
+
+
+def indexes(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_new_database_is_finished_at_once(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "new.db"), isolation_level=None)
+    migrations.migrate(conn, defer=True)
+    assert migrations.current_version(conn) == migrations.LATEST
+    assert migrations.pending(conn) == []
+    assert DEFERRED_INDEXES <= indexes(conn)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def test_open_defers_work_that_grows_with_the_data(tmp_path):
+    path = str(tmp_path / "old.db")
+    unversioned_database(path)
+    db = DBManager(path, kdf_iterations=1000)
+    try:
+        assert db.migrations_pending
+        assert not db.fts_enabled
+        assert db.conn.execute("PRAGMA user_version").fetchone()[0] == migrations.LATEST
+        assert not DEFERRED_INDEXES & indexes(db.conn)
+        assert db.get_task(1).due_date == "2024-01-05 10:00:00"
+
+        assert db.finish_migrations() == [1, 2, 3, 4, 5, 7, 8]
+        assert not db.migrations_pending
+        assert db.fts_enabled
+        assert DEFERRED_INDEXES <= indexes(db.conn)
+        assert db.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert db.get_task(1).due_date == "2024-01-05"
+        assert [t.task for t in db.query_tasks(1, keyword="alpha")] == ["alpha"]
+        completed_day = db.conn.execute("SELECT completed_day FROM tasks WHERE id = 2").fetchone()[0]
+        assert completed_day is not None
+        assert db.finish_migrations() == []
+    finally:
+        db.close(optimize=False)
+
+
+def test_interrupted_backfill_resumes(tmp_path):
+    path = str(tmp_path / "old.db")
+    unversioned_database(path)
+    conn = sqlite3.connect(path, isolation_level=None)
+    migrations.migrate(conn, defer=True)
+
+    def stop(migration, last_id):
+        raise KeyboardInterrupt
+
+    try:
+        migrations.run_pending(conn, batch_size=1, progress=stop, pause=0)
+    except KeyboardInterrupt:
+        pass
+    assert migrations.pending(conn)[0] == 2
+    assert conn.execute("SELECT after_id FROM schema_pending WHERE version = 2").fetchone()[0] == 1
+    assert migrations.run_pending(conn, batch_size=1, pause=0) == [2, 3, 4, 5, 7, 8]
+    assert migrations.pending(conn) == []
+    conn.close()
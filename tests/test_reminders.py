@@ -0,0 +1,75 @@
+from datetime import date, datetime, timedelta
+
+from reminders import ReminderScheduler
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.current = now
+
+    def now(self):
+        return self.current
+
+
+def scheduler(db, user_id, clock):
+    sent = []
+    reminders = ReminderScheduler(db, user_id, clock=clock, notifier=lambda *args: sent.append(args))
+    return reminders, sent
+
+
+def test_reminders_due_together_send_one_summary(qapp, db, user_id):
+    clock = FakeClock(datetime(2026, 3, 10, 8, 0))
+    for i in range(7):
+        db.add_task(user_id, f"task {i}", str(date(2026, 3, 11)))
+    db.add_task(user_id, "later", str(date(2026, 3, 20)))
+    reminders, sent = scheduler(db, user_id, clock)
+    fired = []
+    reminders.reminderDue.connect(fired.append)
+    reminders.reload()
+
+    clock.current += timedelta(hours=2)
+    reminders.fire_due()
+    assert len(sent) == 1
+    title, message = sent[0]
+    assert title == "7 tasks due"
+    assert message.splitlines() == [f"task {i} (tomorrow)" for i in range(5)] + ["and 2 more"]
+    assert len(fired) == 7
+    assert reminders.pending_count() == 0  # "later" is beyond the loaded window
+    reminders.stop()
+
+
+def test_single_reminder_names_the_task(qapp, db, user_id):
+    clock = FakeClock(datetime(2026, 3, 10, 8, 0))
+    db.add_task(user_id, "pay rent", str(date(2026, 3, 11)))
+    reminders, sent = scheduler(db, user_id, clock)
+    reminders.reload()
+
+    reminders.fire_due()
+    assert sent == []
+    clock.current += timedelta(hours=2)
+    reminders.fire_due()
+    reminders.fire_due()
+    assert sent == [("Task due tomorrow", "pay rent")]
+    reminders.stop()
+
+
+def test_only_tasks_due_soon_are_loaded(qapp, db, user_id):
+    clock = FakeClock(datetime(2026, 3, 10, 8, 0))
+    db.add_task(user_id, "soon", str(date(2026, 3, 12)))
+    far = db.add_task(user_id, "far", str(date(2026, 3, 20)))
+    reminders, sent = scheduler(db, user_id, clock)
+    reminders.reload()
+    assert reminders.pending_count() == 1
+
+    # changes beyond the window wait for the reload that reaches them
+    reminders.apply_change("added", user_id, db.add_task(user_id, "also far", str(date(2026, 3, 21))))
+    reminders.apply_change("updated", user_id, db.update_task(far.id, new_task="far away"))
+    assert reminders.pending_count() == 1
+
+    clock.current = datetime(2026, 3, 19, 0, 0, 1)  # the window moves on at midnight
+    reminders.reload()
+    assert reminders.pending_count() == 2
+    clock.current = datetime(2026, 3, 19, 9, 0)
+    reminders.fire_due()
+    assert sent == [("Task due tomorrow", "far away")]
+    reminders.stop()
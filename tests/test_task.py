@@ -0,0 +1,16 @@
+from db_manager import DUE_SOON, OVERDUE, Task
+
+
+def task(status, due_day):
+    return Task(1, "x", status, None, "Medium", due_day, 1)
+
+
+def test_overdue_status_stays_overdue():
+    assert task("Pending", 99).urgency(100) == OVERDUE
+    assert task("Overdue", 99).urgency(100) == OVERDUE
+    assert task("Completed", 99).urgency(100) is None
+
+
+def test_due_soon():
+    assert task("Pending", 101).urgency(100) == DUE_SOON
+    assert task("Pending", None).urgency(100) is None
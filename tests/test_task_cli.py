@@ -0,0 +1,36 @@
+import io
+
+import pytest
+
+import task_cli
+import task_io
+
+
+def test_order_by_must_be_sortable(db, user_id, capsys):
+    with pytest.raises(SystemExit) as exit:
+        task_cli.main(["--db", db.path, "list", "--user", "alice", "--order-by", "due_day"])
+    assert exit.value.code == 2
+    assert "invalid choice" in capsys.readouterr().err
+
+    db.add_task(user_id, "b", priority="Low")
+    db.add_task(user_id, "a", priority="High")
+    assert task_cli.main(["--db", db.path, "list", "--user", "alice", "--order-by", "priority desc"]) == 0
+    assert [line.split()[-1] for line in capsys.readouterr().out.splitlines()] == ["b", "a"]
+
+
+def test_missing_database_is_not_created(tmp_path):
+    path = tmp_path / "typo.db"
+    with pytest.raises(SystemExit, match="no database"):
+        task_cli.main(["--db", str(path), "stats"])
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_list_output_has_ids_and_imports_back(db, user_id, capsys, fmt):
+    task = db.add_task(user_id, "write, \"quoted\" text", "2026-05-01", "High")
+    assert task_cli.main(["--db", db.path, "list", "--user", "alice", "--format", fmt]) == 0
+    out = capsys.readouterr().out
+    assert str(task.id) in out.splitlines()[-1]
+    assert list(task_io.iter_jsonl(io.StringIO(out)) if fmt == "jsonl" else task_io.iter_csv(io.StringIO(out))) == [
+        {"task": task.task, "status": "Pending", "due_date": "2026-05-01", "priority": "High"}
+    ]
@@ -0,0 +1,29 @@
+import io
+
+import pytest
+
+import task_io
+
+
+def test_import_normalizes_rows(db, user_id):
+    data = "task,status,due_date,priority\n  ship it ,Completed,2026-03-01,High\nplan,,,\n"
+    assert task_io.import_tasks(db, user_id, io.StringIO(data)) == 2
+    tasks = db.get_tasks(user_id)
+    assert [(t.task, t.status, t.due_date, t.due_day is not None, t.priority) for t in tasks] == [
+        ("ship it", "Completed", "2026-03-01", True, "High"),
+        ("plan", "Pending", None, False, "Medium"),
+    ]
+
+
+@pytest.mark.parametrize("row, message", [
+    ('{"task": "x", "status": "Bogus"}', "line 2: status 'Bogus'"),
+    ('{"task": "x", "priority": "Weird"}', "line 2: priority 'Weird'"),
+    ('{"task": "x", "due_date": "notadate"}', "line 2: due_date 'notadate'"),
+    ('{"task": " "}', "line 2: missing task"),
+    ('{"task": ', "line 2: "),
+])
+def test_bad_row_imports_nothing(db, user_id, row, message):
+    data = '{"task": "fine"}\n' + row + "\n"
+    with pytest.raises(ValueError, match=message):
+        task_io.import_tasks(db, user_id, io.StringIO(data), "jsonl", chunk_size=1)
+    assert db.get_tasks(user_id) == []
@@ -0,0 +1,45 @@
+from conftest import spin
+from db_manager import DBManager
+
+
+def open_window(qapp, db, user_id):
+    from ui_main import TaskManagerUI
+    window = TaskManagerUI(user_id, db)
+    spin(300)  # first page loads on a worker
+    return window
+
+
+def test_reset_for_everyone_reaches_window(qapp, db, user_id):
+    window = open_window(qapp, db, user_id)
+    seen = []
+    window.taskChanged.connect(lambda event, uid, task: seen.append((event, uid)))
+    db.add_tasks_bulk(user_id, [{"task": "from reset"}])  # bypasses the model
+    window.taskChanged.emit("reset", None, None)
+    spin(300)
+    assert seen[-1] == ("reset", None)
+    assert window.task_model.rowCount() == 1
+    window.close()
+
+
+def test_external_bulk_add_past_change_batch(qapp, db, user_id, tmp_path):
+    db.add_task(user_id, "first")
+    window = open_window(qapp, db, user_id)
+    assert window.task_model.rowCount() == 1
+    other = DBManager(db.path, kdf_iterations=1000)
+    try:
+        other.add_tasks_bulk(user_id, [{"task": f"t{i}"} for i in range(DBManager.CHANGE_BATCH + 100)])
+    finally:
+        other.close(optimize=False)
+    window.poll_external_changes()
+    spin(500)
+    assert window.task_model.rowCount() > 1
+    window.close()
+
+
+def test_bulk_update_refreshes_window(qapp, db, user_id):
+    task = db.add_task(user_id, "old text")
+    window = open_window(qapp, db, user_id)
+    db.update_tasks_bulk([{"id": task.id, "task": "new text"}])
+    spin(500)
+    assert window.task_model.data(window.task_model.index(0, 0)) == "new text"
+    window.close()
@@ -1,14 +1,58 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QPushButton, QLineEdit, QLabel,
-    QVBoxLayout, QTableWidget, QTableWidgetItem, QHBoxLayout,
-    QMessageBox, QComboBox, QDateEdit, QHeaderView, QToolButton
+    QVBoxLayout, QTableView, QHBoxLayout,
+    QMessageBox, QComboBox, QDateEdit, QHeaderView, QToolButton, QStyle
 )
-from PyQt5.QtCore import Qt, QDate, QSize
-from PyQt5.QtGui import QColor, QBrush, QIcon
-from datetime import datetime, timedelta
+import logging
+import os
+import sqlite3
+from PyQt5.QtCore import (
+    Qt, QDate, QDateTime, QTime, QTimer, QFileSystemWatcher, QRunnable, QThreadPool, pyqtSignal
+)
+from datetime import datetime
+from task_model import TaskTableModel, TaskRowDelegate, DeleteButtonDelegate
+from query_scheduler import TaskQueryScheduler
+from reminders import ReminderScheduler, desktop_notifier
+
+logger = logging.getLogger("task_manager.ui")
+
+
+class _ArchiveJob(QRunnable):
+    # Batched and sleeps between batches, so it stays off the GUI thread
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+
+    def run(self):
+        try:
+            self.db.archive_completed()
+        except sqlite3.Error as e:
+            logger.warning("archiving completed tasks failed: %s", e)
+
+class _MigrationJob(QRunnable):
+    # Index builds, row backfills and VACUUM a schema upgrade left for after startup
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+
+    def run(self):
+        try:
+            self.db.finish_migrations()
+        except sqlite3.Error as e:  # resumes at the next start
+            logger.warning("finishing the schema upgrade failed: %s", e)
 
 class TaskManagerUI(QMainWindow):
-    def __init__(self, user_id, db):
+    OVERDUE_SWEEP_INTERVAL_MS = 15 * 60 * 1000
+    STATS_REFRESH_MS = 60 * 1000
+    CHANGE_POLL_MS = 5 * 1000  # fallback when file change events are missed
+    MAINTENANCE_STEP_MS = 60 * 1000  # see DatabaseMaintenance.idle_step
+
+    # DBManager notifies on the writing thread; this hops back to the GUI thread
+    taskChanged = pyqtSignal(str, object, object)  # event, user_id (None = everyone), Task
+    # emitted whenever a first page of tasks lands in the table
+    tasksLoaded = pyqtSignal()
+
+    def __init__(self, user_id, db, overdue_interval_ms=None):
         super().__init__()
         self.setWindowTitle("Task Manager")
         self.setGeometry(100, 100, 1000, 600)
@@ -51,6 +95,10 @@ class TaskManagerUI(QMainWindow):
         filter_layout.addWidget(self.due_to)
         filter_layout.addWidget(self.clear_filters_btn)
         filter_layout.addWidget(self.dark_toggle)
+        if db.instrumentation is not None:
+            self.diagnostics_btn = QPushButton("Diagnostics")
+            self.diagnostics_btn.clicked.connect(self.show_diagnostics)
+            filter_layout.addWidget(self.diagnostics_btn)
 
         # ===== task entry row =====
         self.task_input = QLineEdit()
@@ -62,7 +110,7 @@ class TaskManagerUI(QMainWindow):
         self.priority_input = QComboBox()
         self.priority_input.addItems(["High", "Medium", "Low"])
         self.add_button = QPushButton("Add Task")
-        self.add_button.setIcon(self.style().standardIcon(QPushButton().style().SP_DialogApplyButton))
+        self.add_button.setIcon(self.style().standardIcon(QStyle.SP_DialogApplyButton))
 
         entry_layout = QHBoxLayout()
         entry_layout.addWidget(QLabel("Task:"))
@@ -74,9 +122,13 @@ class TaskManagerUI(QMainWindow):
         entry_layout.addWidget(self.add_button)
 
         # ===== table =====
-        self.task_table = QTableWidget()
-        self.task_table.setColumnCount(5)
-        self.task_table.setHorizontalHeaderLabels(["Task", "Status", "Due Date", "Priority", "Delete"])
+        self.task_model = TaskTableModel(db, user_id, self)
+        self.row_delegate = TaskRowDelegate(self)
+        self.delete_delegate = DeleteButtonDelegate(self)
+        self.task_table = QTableView()
+        self.task_table.setModel(self.task_model)
+        self.task_table.setItemDelegate(self.row_delegate)
+        self.task_table.setItemDelegateForColumn(TaskTableModel.DELETE_COLUMN, self.delete_delegate)
         self.task_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.task_table.setSortingEnabled(True)
         self.task_table.setSelectionBehavior(self.task_table.SelectRows)
@@ -104,21 +156,71 @@ class TaskManagerUI(QMainWindow):
 
         # ===== signals =====
         self.add_button.clicked.connect(self.add_task)
-        self.task_table.cellDoubleClicked.connect(self.toggle_status)
-        self.task_table.cellChanged.connect(self.cell_edited)
-        self.search_input.textChanged.connect(self.reload_tasks)
-        self.status_filter.currentTextChanged.connect(self.reload_tasks)
-        self.priority_filter.currentTextChanged.connect(self.reload_tasks)
-        self.due_from.dateChanged.connect(self.reload_tasks)
-        self.due_to.dateChanged.connect(self.reload_tasks)
+        self.task_table.doubleClicked.connect(self.toggle_status)
+        self.task_model.cellEdited.connect(self.cell_edited, Qt.QueuedConnection)
+        self.delete_delegate.deleteClicked.connect(self.delete_task)
+        self.search_input.textChanged.connect(self.schedule_reload)
+        self.status_filter.currentTextChanged.connect(self.schedule_reload)
+        self.priority_filter.currentTextChanged.connect(self.schedule_reload)
+        self.due_from.dateChanged.connect(self.schedule_reload)
+        self.due_to.dateChanged.connect(self.schedule_reload)
         self.clear_filters_btn.clicked.connect(self.reset_filters)
         self.dark_toggle.toggled.connect(self.toggle_dark_mode)
-
-        self.loading = False
-
-        self.reload_tasks()
-        self.update_user_stats()
+        self.taskChanged.connect(self._on_task_changed)
+        self._forward_change = self.taskChanged.emit
+        self.db.subscribe(self._forward_change)
+
+        # ===== background filter queries =====
+        self.query_scheduler = TaskQueryScheduler(db, user_id, TaskTableModel.PAGE_SIZE, parent=self)
+        self.query_scheduler.resultsReady.connect(self._apply_query_results)
+        self.query_scheduler.queryFailed.connect(lambda message: self.statusBar().showMessage(message, 5000))
+
+        # ===== overdue sweep: once now, then periodically and at midnight =====
+        self.overdue_timer = QTimer(self)
+        self.overdue_timer.timeout.connect(self._update_overdue)
+        self.overdue_timer.start(overdue_interval_ms or self.OVERDUE_SWEEP_INTERVAL_MS)
+        self.midnight_timer = QTimer(self)
+        self.midnight_timer.setSingleShot(True)
+        self.midnight_timer.timeout.connect(self._on_midnight)
+        self._arm_midnight_timer()
+        QTimer.singleShot(0, self._update_overdue)
+        QTimer.singleShot(0, self._archive_completed)
+        if self.db.migrations_pending:
+            QThreadPool.globalInstance().start(_MigrationJob(self.db))
+
+        # ===== due-date reminders =====
+        self.reminders = ReminderScheduler(db, user_id, notifier=desktop_notifier(), parent=self)
+        self.reminders.reminderDue.connect(self._show_reminder)
+        QTimer.singleShot(0, self.reminders.reload)
+
+        # ===== changes from other instances sharing the database file =====
+        # Every commit touches the -wal file, so the watcher normally triggers
+        # the poll; the timer only catches what the watcher misses.
+        self.change_poll_timer = QTimer(self)
+        self.change_poll_timer.timeout.connect(self.poll_external_changes)
+        self.change_poll_timer.start(self.CHANGE_POLL_MS)
+        self.change_poll_soon = QTimer(self)
+        self.change_poll_soon.setSingleShot(True)
+        self.change_poll_soon.timeout.connect(self.poll_external_changes)
+        self.db_watcher = QFileSystemWatcher(self)
+        self.db_watcher.fileChanged.connect(lambda _: self.change_poll_soon.start(50))
+        self._watch_db_files()
+
+        # ===== database upkeep in small steps =====
+        self.maintenance_timer = QTimer(self)
+        self.maintenance_timer.timeout.connect(self._maintenance_step)
+        self.maintenance_timer.start(self.MAINTENANCE_STEP_MS)
+
+        # ===== stats refresh, off the construction path =====
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_user_stats)
+        self.stats_timer.start(self.STATS_REFRESH_MS)
+        QTimer.singleShot(0, self.update_user_stats)
+
+        # ===== first page loads on a worker so the window paints right away =====
         self.apply_light_theme()
+        self.statusBar().showMessage("Loading tasks...")
+        self.query_scheduler.run_now(self._current_filters(), self.task_model.order_by)
 
     def reset_filters(self):
         self.search_input.clear()
@@ -126,95 +228,52 @@ class TaskManagerUI(QMainWindow):
         self.priority_filter.setCurrentIndex(0)
         self.due_from.setDate(QDate.currentDate().addDays(-7))
         self.due_to.setDate(QDate.currentDate().addDays(30))
-        self.reload_tasks()
+        self.schedule_reload()
 
     def reload_tasks(self):
-        self.loading = True
-        self._update_overdue()
-        tasks = self.db.get_tasks(self.user_id)
+        with self.db.span("reload_tasks"):
+            self.query_scheduler.cancel()
+            self.task_model.reload(self._current_filters())
+        self.tasksLoaded.emit()
+
+    def schedule_reload(self):
+        # Debounced; the first page is fetched on a worker thread
+        self.query_scheduler.schedule(self._current_filters(), self.task_model.order_by)
+
+    def _apply_query_results(self, filters, order_by, rows):
+        if order_by != self.task_model.order_by:
+            # header clicked while the query was running
+            self.query_scheduler.run_now(filters, self.task_model.order_by)
+            return
+        with self.db.span("apply_query_results"):
+            self.task_model.set_first_page(filters, order_by, rows)
+        self.statusBar().clearMessage()
+        self.tasksLoaded.emit()
 
-        keyword = self.search_input.text().strip().lower()
-        status_filter = self.status_filter.currentText()
-        priority_filter = self.priority_filter.currentText()
-        due_from = self.due_from.date().toPyDate()
-        due_to = self.due_to.date().toPyDate()
-
-        self.task_table.setRowCount(0)
-        for task_id, task, status, due_date, priority in tasks:
-            if keyword and keyword not in task.lower():
-                continue
-            if status_filter != "All" and status != status_filter:
-                continue
-            if priority_filter != "Any Priority" and priority != priority_filter:
-                continue
-            if due_date:
-                try:
-                    due_dt = datetime.strptime(due_date, "%Y-%m-%d").date()
-                except ValueError:
-                    continue
-                if due_dt < due_from or due_dt > due_to:
-                    continue
-            row = self.task_table.rowCount()
-            self.task_table.insertRow(row)
-
-            task_item = QTableWidgetItem(task)
-            task_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable)
-            self.task_table.setItem(row, 0, task_item)
-
-            status_item = QTableWidgetItem(status)
-            status_item.setFlags(status_item.flags() ^ Qt.ItemIsEditable)
-            self.task_table.setItem(row, 1, status_item)
-
-            due_item = QTableWidgetItem(due_date if due_date else "")
-            due_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable)
-            self.task_table.setItem(row, 2, due_item)
-
-            prio_item = QTableWidgetItem(priority)
-            prio_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable)
-            # color priority
-            color = {"High": QColor(255, 200, 200), "Medium": QColor(255, 255, 200), "Low": QColor(200, 255, 200)}.get(priority, QColor(255, 255, 255))
-            prio_item.setBackground(QBrush(color))
-            self.task_table.setItem(row, 3, prio_item)
-
-            delete_btn = QPushButton()
-            delete_btn.setIcon(self.style().standardIcon(QPushButton().style().SP_TrashIcon if hasattr(QPushButton().style(), 'SP_TrashIcon') else QPushButton().style().SP_DialogCloseButton))
-            delete_btn.setToolTip("Delete task")
-            delete_btn.setFixedSize(QSize(32, 32))
-            delete_btn.clicked.connect(lambda _, tid=task_id: self.delete_task(tid))
-            self.task_table.setCellWidget(row, 4, delete_btn)
-
-            # Row background for due soon / overdue
-            if due_date:
-                try:
-                    due_dt = datetime.strptime(due_date, "%Y-%m-%d").date()
-                    today = datetime.today().date()
-                    if due_dt < today and status == "Pending":
-                        # overdue
-                        for c in range(5):
-                            item = self.task_table.item(row, c)
-                            if item:
-                                item.setBackground(QBrush(QColor(255, 220, 220)))
-                    elif 0 <= (due_dt - today).days <= 2:
-                        for c in range(5):
-                            item = self.task_table.item(row, c)
-                            if item:
-                                item.setBackground(QBrush(QColor(255, 245, 200)))
-                except ValueError:
-                    pass
+    def _update_overdue(self):
+        with self.db.span("update_overdue"):
+            self.db.mark_overdue(datetime.today().date())
 
-        self.loading = False
+    def _arm_midnight_timer(self):
+        now = QDateTime.currentDateTime()
+        midnight = QDateTime(now.date().addDays(1), QTime(0, 0))
+        self.midnight_timer.start(max(1000, now.msecsTo(midnight) + 1000))
 
-    def _update_overdue(self):
-        today = datetime.today().date()
-        tasks = self.db.get_tasks(self.user_id)
-        for task_id, task, status, due_date, priority in tasks:
-            if due_date:
-                try:
-                    due = datetime.strptime(due_date, "%Y-%m-%d").date()
-                    if due < today and status == "Pending":
-                        self.db.update_task_status(task_id, "Overdue")
-                except ValueError:
-                    pass
+    def _archive_completed(self):
+        QThreadPool.globalInstance().start(_ArchiveJob(self.db))
+
+    def _maintenance_step(self):
+        try:
+            self.db.maintenance.idle_step()
+        except sqlite3.Error as e:  # e.g. busy with another instance's writes
+            logger.warning("database maintenance step failed: %s", e)
+
+    def _on_midnight(self):
+        self._update_overdue()
+        self.task_model.refresh_urgency()  # due-soon and overdue shading moves with the date
+        self.reminders.reload()  # takes in the tasks now close enough to remind about
+        self._archive_completed()
+        self._arm_midnight_timer()
 
     def add_task(self):
         task_text = self.task_input.text().strip()
@@ -226,88 +285,93 @@ class TaskManagerUI(QMainWindow):
         due_str = due_qdate.strftime("%Y-%m-%d")
         self.db.add_task(self.user_id, task_text, due_str, priority)
         self.task_input.clear()
-        self.reload_tasks()
-
-    def toggle_status(self, row, col):
-        if col == 1:
-            status_item = self.task_table.item(row, 1)
-            if not status_item:
-                return
-            current = status_item.text()
-            visible = self._visible_filtered_tasks()
-            if row >= len(visible):
-                return
-            task_id = visible[row][0]
+
+    def toggle_status(self, index):
+        if index.column() == 1:
+            task_id = index.data(Qt.UserRole)
+            current = index.data()
             new_status = "Completed" if current in ("Pending", "Overdue") else "Pending"
             self.db.update_task_status(task_id, new_status)
-            self.reload_tasks()
-
-    def cell_edited(self, row, column):
-        if self.loading:
-            return
-        visible = self._visible_filtered_tasks()
-        if row >= len(visible):
-            return
-        task_id = visible[row][0]
-        new_value = self.task_table.item(row, column).text().strip()
 
+    def cell_edited(self, task_id, column, new_value):
         if column == 0:  # task text
             if new_value:
                 self.db.update_task(task_id, new_task=new_value)
             else:
-                self.reload_tasks()
+                self.task_model.refresh_task(task_id)
         elif column == 2:  # due date
             if new_value:
                 try:
                     datetime.strptime(new_value, "%Y-%m-%d")
                     self.db.update_task(task_id, new_due_date=new_value)
                 except ValueError:
-                    self.reload_tasks()
+                    self.task_model.refresh_task(task_id)
             else:
                 self.db.update_task(task_id, new_due_date=None)
         elif column == 3:  # priority
             if new_value in ("High", "Medium", "Low"):
                 self.db.update_task(task_id, new_priority=new_value)
             else:
-                self.reload_tasks()
+                self.task_model.refresh_task(task_id)
 
     def delete_task(self, task_id):
         self.db.delete_task(task_id)
-        self.reload_tasks()
 
-    def _visible_filtered_tasks(self):
-        # reuse same filtering logic to get current list in order
-        tasks = self.db.get_tasks(self.user_id)
-        keyword = self.search_input.text().strip().lower()
+    def _watch_db_files(self):
+        # Checkpoints may delete and recreate the -wal file, dropping the watch
+        watched = set(self.db_watcher.files())
+        for path in (self.db.path, self.db.path + "-wal"):
+            if path not in watched and os.path.exists(path):
+                self.db_watcher.addPath(path)
+
+    def poll_external_changes(self):
+        # Changes arrive through taskChanged like local ones
+        self.db.poll_changes()
+        self._watch_db_files()
+
+    def _show_reminder(self, task):
+        self.statusBar().showMessage(f"Reminder: \"{task.task}\" is due {task.due_date}", 15000)
+
+    def _on_task_changed(self, event, user_id, task):
+        self.query_scheduler.note_change()
+        self.reminders.apply_change(event, user_id, task)
+        if event == "reset":
+            if user_id in (None, self.user_id):
+                self.schedule_reload()
+            return
+        self.task_model.apply_change(event, user_id, task)
+
+    def closeEvent(self, event):
+        self.query_scheduler.cancel()
+        self.reminders.stop()
+        if self.db_watcher.files():
+            self.db_watcher.removePaths(self.db_watcher.files())
+        for timer in (self.change_poll_timer, self.change_poll_soon, self.maintenance_timer,
+                      self.overdue_timer, self.midnight_timer, self.stats_timer):
+            timer.stop()
+        self.db.unsubscribe(self._forward_change)
+        super().closeEvent(event)
+
+    def _current_filters(self):
         status_filter = self.status_filter.currentText()
         priority_filter = self.priority_filter.currentText()
-        due_from = self.due_from.date().toPyDate()
-        due_to = self.due_to.date().toPyDate()
-
-        filtered = []
-        for task in tasks:
-            task_id, task_text, status, due_date, priority = task
-            if keyword and keyword not in task_text.lower():
-                continue
-            if status_filter != "All" and status != status_filter:
-                continue
-            if priority_filter != "Any Priority" and priority != priority_filter:
-                continue
-            if due_date:
-                try:
-                    due_dt = datetime.strptime(due_date, "%Y-%m-%d").date()
-                except ValueError:
-                    continue
-                if due_dt < due_from or due_dt > due_to:
-                    continue
-            filtered.append(task)
-        return filtered
+        return {
+            "keyword": self.search_input.text().strip() or None,
+            "status": None if status_filter == "All" else status_filter,
+            "priority": None if priority_filter == "Any Priority" else priority_filter,
+            "due_from": self.due_from.date().toString("yyyy-MM-dd"),
+            "due_to": self.due_to.date().toString("yyyy-MM-dd"),
+        }
 
     def update_user_stats(self):
-        registered = self.db.count_registered_users()
-        logged_in_today = self.db.count_logged_in_users_today()
-        self.registered_label.setText(f"Total Registered Users: {registered}")
-        self.logged_in_today_label.setText(f"Users Logged in Today: {logged_in_today}")
+        with self.db.span("update_user_stats"):
+            stats = self.db.get_user_stats()
+        self.registered_label.setText(f"Total Registered Users: {stats['registered']}")
+        self.logged_in_today_label.setText(f"Users Logged in Today: {stats['logged_in_today']}")
+
+    def show_diagnostics(self):
+        from diagnostics_ui import DiagnosticsDialog
+        DiagnosticsDialog(self.db.instrumentation, self, cache=self.db.cache).exec_()
 
     def toggle_dark_mode(self, on):
         self.dark_mode = on
@@ -318,21 +382,28 @@ class TaskManagerUI(QMainWindow):
             self.apply_light_theme()
             self.dark_toggle.setText("Dark Mode")
 
+    def _set_row_theme(self, theme):
+        for delegate in (self.row_delegate, self.delete_delegate):
+            delegate.set_theme(theme)
+        self.task_table.viewport().update()
+
     def apply_dark_theme(self):
+        self._set_row_theme("dark")
         self.setStyleSheet("""
             QMainWindow { background: #2b2b2b; color: #f0f0f0; }
             QLabel, QLineEdit, QComboBox { color: #f0f0f0; }
-            QTableWidget { background: #3c3f41; gridline-color: #555; }
+            QTableView { background: #3c3f41; gridline-color: #555; }
             QHeaderView::section { background: #444; color: #f0f0f0; }
             QPushButton { background: #555; color: #f0f0f0; border-radius:4px; padding:4px; }
         """)
 
     def apply_light_theme(self):
+        self._set_row_theme("light")
         self.setStyleSheet("")  # default
         self.setStyleSheet("""
             QMainWindow { background: #ffffff; color: #000000; }
             QLabel, QLineEdit, QComboBox { color: #000000; }
-            QTableWidget { background: #f0f0f0; gridline-color: #ccc; }
+            QTableView { background: #f0f0f0; gridline-color: #ccc; }
             QHeaderView::section { background: #e0e0e0; color: #000000; }
             QPushButton { background: #d0d0d0; color: #000000; border-radius:4px; padding:4px; }
         """)
\ No newline at end of file